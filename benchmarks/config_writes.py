@@ -0,0 +1,87 @@
+"""config_writes: stress test of concurrent config writes
+
+Runs N processes which set disjoint options of the same local config file at
+the same time, then checks that every update survived. Each set is a
+separate read-modify-write (`Config.set_local`), the worst case for lost
+updates.
+
+Run it from the repository root; it imports cliq from the checkout. The exit
+status is 0 if every update survived, and 1 if any update was lost or a
+process failed (the lost options are listed on stderr), so it can gate CI.
+
+example:
+
+  $ python benchmarks/config_writes.py -n 8 -m 50
+  8 processes x 50 sets in 1.23 s: 0 lost updates, 0 failed processes
+  $ echo $?
+  0
+"""
+
+import argparse
+import multiprocessing
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from cliq.core.config import Config
+from cliq.core.init import Init
+
+PROGRAM_NAME = 'stress'
+MAX_LISTED = 10
+
+
+def writer(workspace, worker, count):
+    config = Config(PROGRAM_NAME, workspace)
+    for i in range(count):
+        config.set_local('worker{}'.format(worker), 'key{}'.format(i), str(i))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='config_writes', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--processes', type=int, default=8, help='number of processes')
+    parser.add_argument('-m', '--sets', type=int, default=50, help='number of sets per process')
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix='cliq-stress-')
+    try:
+        os.environ['XDG_CONFIG_HOME'] = os.path.join(tmpdir, 'config')
+        workspace = os.path.join(tmpdir, 'workspace')
+        os.makedirs(workspace)
+        Init(PROGRAM_NAME, workspace)
+
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=writer, args=(workspace, worker, args.sets))
+                     for worker in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [process for process in processes if process.exitcode != 0]
+
+        config = Config(PROGRAM_NAME, workspace).local_config
+        lost = [(worker, i)
+                for worker in range(args.processes) for i in range(args.sets)
+                if config.get('worker{}'.format(worker), 'key{}'.format(i), fallback=None) != str(i)]
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print('{} processes x {} sets in {:.2f} s: {} lost updates, {} failed processes'
+          .format(args.processes, args.sets, elapsed, len(lost), len(failed)))
+    for worker, i in lost[:MAX_LISTED]:
+        print('lost: worker{}.key{}'.format(worker, i), file=sys.stderr)
+    if len(lost) > MAX_LISTED:
+        print('lost: and {} more'.format(len(lost) - MAX_LISTED), file=sys.stderr)
+
+    return 1 if lost or failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""startup: cold-start benchmarks for the dispatch path of generated apps
+
+Generates synthetic apps with `cliq create project` and times, in
+subprocesses, how long it takes from process start to the end of
+`Command.run` for:
+
+  - <app> --help
+  - <app> --version
+  - <app> config --list
+  - <app> noop            (a command which does nothing)
+
+A cold run has no bytecode and no metadata cache. Warm runs reuse them.
+
+example:
+
+  # run and save results
+  $ python benchmarks/startup.py -o startup.json
+
+  # compare with a baseline and fail if warm runs are 20% slower
+  $ python benchmarks/startup.py --baseline startup.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+
+CASES = {
+    '--help' : ['--help'],
+    '--version' : ['--version'],
+    'config --list' : ['config', '--list'],
+    'noop' : ['noop'],
+}
+
+NOOP_COMMAND = '''"""noop: a command which does nothing
+"""
+
+_setup_ = {
+    'version' : '0.0.0',
+    'description' : 'do nothing',
+}
+
+from cliq.main.command import SimpleCommand
+
+def init(app):
+    return Command(app)
+
+class Command(SimpleCommand):
+    def __init__(self, app = None, name = __name__):
+        super().__init__(app, name)
+
+    def run(self, argv):
+        self.parser.parse_args(argv)
+'''
+
+
+def cliq(argv, **kwargs):
+    """Runs `cliq` of this source tree."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT_PATH))
+    subprocess.run([sys.executable, '-m', 'cliq.main.cli'] + argv,
+                   env=env, check=True, stdout=subprocess.DEVNULL, **kwargs)
+
+
+class SyntheticApp(object):
+    def __init__(self, workdir, size, layout, manifest=True):
+        self.size = size
+        self.layout = layout
+        self.project_path = pathlib.Path(workdir) / 'app{}{}'.format(size, layout)
+        self.library = self.project_path.name
+        if layout == 'multi':
+            self.module = self.library + '.first'
+            self.module_path = self.project_path / self.library / 'first'
+        else:
+            self.module = self.library
+            self.module_path = self.project_path / self.library
+        self.command_path = self.module_path / 'main' / 'command'
+
+        self.config_home = pathlib.Path(workdir) / 'config'
+        self.pycache_prefix = pathlib.Path(workdir) / 'pycache' / self.project_path.name
+
+        self.__generate(manifest)
+
+    def __generate(self, manifest):
+        argv = ['create', 'project', str(self.project_path)]
+        if self.layout == 'multi':
+            argv += ['--cli', 'first,second']
+        cliq(argv)
+
+        # generate one command with `cliq create command` and copy it
+        template = self.command_path / 'cmd0.py'
+        cliq(['create', 'command', str(template), '--desc', 'synthetic command'])
+        for i in range(1, self.size - 1):
+            shutil.copy(template, self.command_path / 'cmd{}.py'.format(i))
+        with open(self.command_path / 'noop.py', 'w') as file:
+            file.write(NOOP_COMMAND)
+
+        if manifest:
+            cliq(['build', '--quiet', str(self.command_path)])
+        else:
+            manifest_filename = self.command_path / '_manifest.py'
+            if manifest_filename.exists():
+                manifest_filename.unlink()
+
+        # a workspace for `config --list`
+        self.run(['init'])
+
+    def clear_caches(self):
+        """Removes bytecode and metadata caches."""
+        shutil.rmtree(self.pycache_prefix, ignore_errors=True)
+        for path in self.project_path.rglob('__pycache__'):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def run(self, argv):
+        """Runs the app and returns the wall time in seconds."""
+        env = dict(os.environ,
+                   PYTHONPATH=os.pathsep.join([str(ROOT_PATH), str(self.project_path)]),
+                   PYTHONPYCACHEPREFIX=str(self.pycache_prefix),
+                   XDG_CONFIG_HOME=str(self.config_home))
+        code = 'import {mod}.main; {mod}.main.main()'.format(mod=self.module)
+
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', code] + argv, env=env,
+                              cwd=str(self.project_path),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+
+        if proc.returncode != 0:
+            raise RuntimeError('{} {} failed:\n{}'.format(self.module, ' '.join(argv),
+                                                          proc.stderr.decode()))
+        return elapsed
+
+
+def measure(app, argv, repeat):
+    app.clear_caches()
+    cold = app.run(argv)
+
+    app.run(argv)    # warm up
+    warm = [app.run(argv) for i in range(repeat)]
+
+    return {
+        'cold' : cold,
+        'warm' : {
+            'min' : min(warm),
+            'median' : statistics.median(warm),
+            'mean' : statistics.mean(warm),
+        },
+    }
+
+
+def key(result):
+    return (result['size'], result['layout'], result['case'])
+
+
+def compare(results, baseline, threshold):
+    """Returns warm-run regressions slower than the baseline by `threshold`."""
+    baseline_results = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        base = baseline_results.get(key(result))
+        if base is None:
+            continue
+        ratio = result['warm']['median'] / base['warm']['median']
+        if ratio > 1 + threshold:
+            regressions.append((result, base, ratio))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='startup',
+                                     description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=str, default='10,100,1000',
+                        help='numbers of commands separated by commas')
+    parser.add_argument('--layouts', type=str, default='single,multi',
+                        help='single (default project) and/or multi (--cli) separated by commas')
+    parser.add_argument('--cases', type=str, default=','.join(CASES),
+                        help='cases separated by commas')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='number of warm runs')
+    parser.add_argument('--no-manifest', action='store_true', help='remove command manifests')
+    parser.add_argument('-o', '--output', type=str, help='write results to a JSON file')
+    parser.add_argument('--baseline', type=str, help='baseline results (JSON) to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown of warm runs against the baseline (default: 0.2)')
+    parser.add_argument('--workdir', type=str, help='directory for generated apps (kept)')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='cliq-bench-')
+
+    results = {
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'cliq' : subprocess.run([sys.executable, '-c', 'import cliq; print(cliq.__version__)'],
+                                env=dict(os.environ, PYTHONPATH=str(ROOT_PATH)),
+                                stdout=subprocess.PIPE, check=True).stdout.decode().strip(),
+        'manifest' : not args.no_manifest,
+        'results' : [],
+    }
+
+    try:
+        for layout in args.layouts.split(','):
+            for size in [int(size) for size in args.sizes.split(',')]:
+                app = SyntheticApp(workdir, size, layout, manifest=not args.no_manifest)
+                for case in args.cases.split(','):
+                    result = dict(size=size, layout=layout, case=case)
+                    result.update(measure(app, CASES[case], args.repeat))
+                    results['results'].append(result)
+                    print('{:>5} {:<6} {:<14} cold {:8.1f} ms  warm {:8.1f} ms'
+                          .format(size, layout, case, result['cold'] * 1000,
+                                  result['warm']['median'] * 1000))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.threshold)
+        for result, base, ratio in regressions:
+            print('regression: {:>5} {:<6} {:<14} {:8.1f} ms -> {:8.1f} ms (+{:.0%})'
+                  .format(result['size'], result['layout'], result['case'],
+                          base['warm']['median'] * 1000, result['warm']['median'] * 1000,
+                          ratio - 1))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""Declarative arguments
+
+A command may declare its arguments in `_setup_['arguments']`, a list of
+literal dicts with the keyword arguments of `add_argument()` and `names`:
+
+    _setup_ = {
+        'version' : '0.1.0',
+        'description' : 'a toy simple command',
+        'arguments' : [
+            {'names' : ['something'], 'help' : 'something'},
+            {'names' : ['-f', '--format'], 'default' : 'text/plain', 'help' : 'format'},
+        ],
+    }
+
+`type` is the name of a builtin: 'str', 'int', 'float', 'complex' or 'bool'.
+
+The list is compiled into a parser table, which is cached with the command
+metadata (see cliq.core.metadata). `FastParser` parses common command lines
+with the table. Anything else (help, errors, abbreviations, `--`, ...) is
+left to an `argparse.ArgumentParser` built from the same list.
+"""
+
+TYPES = {
+    'str' : str,
+    'int' : int,
+    'float' : float,
+    'complex' : complex,
+    'bool' : bool,
+}
+
+# keyword arguments of add_argument() in a declaration
+KEYWORDS = ('action', 'nargs', 'const', 'default', 'type', 'choices', 'required',
+            'help', 'metavar', 'dest')
+
+# actions and nargs the fast parser handles
+FAST_ACTIONS = ('store', 'store_true', 'store_false', 'store_const', 'count', 'append')
+FAST_NARGS = (None, '?', '*', '+')
+
+
+class SpecError(ValueError):
+    pass
+
+
+def add_arguments(parser, arguments):
+    """Adds declared arguments to an argparse.ArgumentParser.
+    """
+    for argument in arguments:
+        kwargs = {key: value for key, value in argument.items() if key != 'names'}
+        if 'type' in kwargs:
+            kwargs['type'] = TYPES[kwargs['type']]
+        parser.add_argument(*argument['names'], **kwargs)
+
+
+def compile_arguments(arguments):
+    """Compiles declared arguments into a parser table for `FastParser`.
+
+    Returns None if the fast parser cannot handle the arguments, and raises
+    SpecError if a declaration is invalid.
+    """
+    if not isinstance(arguments, (list, tuple)):
+        raise SpecError('arguments: a list expected')
+
+    fast = True
+    actions = []
+    for argument in arguments:
+        if not isinstance(argument, dict) or not argument.get('names'):
+            raise SpecError('arguments: a dict with names expected: {!r}'.format(argument))
+        unknown = set(argument) - set(KEYWORDS) - {'names'}
+        if unknown:
+            raise SpecError('arguments: unknown keys: {}'.format(', '.join(sorted(unknown))))
+        if argument.get('type', 'str') not in TYPES:
+            raise SpecError('arguments: unknown type: {}'.format(argument['type']))
+
+        names = list(argument['names'])
+        option_strings = [name for name in names if name.startswith('-')]
+        action = argument.get('action', 'store')
+        nargs = argument.get('nargs')
+
+        if option_strings:
+            dest = argument.get('dest')
+            if dest is None:
+                long_strings = [name for name in option_strings if name.startswith('--')]
+                dest = (long_strings or option_strings)[0].lstrip('-').replace('-', '_')
+            if nargs is not None:
+                fast = False
+        else:
+            dest = names[0]
+            if not isinstance(nargs, int) and nargs not in FAST_NARGS:
+                fast = False
+            if action != 'store':
+                fast = False
+
+        if action not in FAST_ACTIONS:
+            fast = False
+
+        if action == 'store_true':
+            default = argument.get('default', False)
+        elif action == 'store_false':
+            default = argument.get('default', True)
+        else:
+            default = argument.get('default')
+
+        actions.append({
+            'dest' : dest,
+            'option_strings' : option_strings,
+            'action' : action,
+            'nargs' : nargs,
+            'const' : argument.get('const'),
+            'default' : default,
+            'type' : argument.get('type'),
+            'choices' : (list(argument['choices'])
+                         if argument.get('choices') is not None else None),
+            'required' : argument.get('required', not option_strings and nargs not in ('?', '*')),
+        })
+
+    if not fast:
+        return None
+
+    return {'actions' : actions}
+
+
+class Fallback(Exception):
+    # the command line has to be parsed by argparse
+    pass
+
+
+class FastParser(object):
+    def __init__(self, table):
+        """
+        table: a parser table returned by `compile_arguments()`
+        """
+        self.actions = table['actions']
+        self.options = {}
+        self.positionals = []
+        for action in self.actions:
+            for option_string in action['option_strings']:
+                self.options[option_string] = action
+            if not action['option_strings']:
+                self.positionals.append(action)
+
+    def parse(self, argv, namespace=None):
+        """Parses `argv` and returns an argparse.Namespace, or None if `argv`
+        has to be parsed by argparse.
+        """
+        try:
+            return self.__parse(argv, namespace)
+        except Fallback:
+            return None
+
+    def __parse(self, argv, namespace):
+        import argparse
+
+        values = {}
+        seen = set()
+        positionals = list(self.positionals)
+
+        # with optional positional arguments ('?' or '*'), versions of argparse
+        # disagree on positional arguments after options. leave them to argparse.
+        optional = any(action['nargs'] in ('?', '*') for action in positionals)
+
+        index = 0
+        while index < len(argv):
+            if self.__is_option(argv[index]):
+                index = self.__take_option(argv, index, values, seen)
+                continue
+
+            if optional and index > 0:
+                raise Fallback
+            end = index
+            while end < len(argv) and not self.__is_option(argv[end]):
+                end += 1
+            self.__take_positionals(positionals, argv[index:end], end == len(argv), values, seen)
+            index = end
+
+        self.__take_positionals(positionals, [], True, values, seen)
+
+        if namespace is None:
+            namespace = argparse.Namespace()
+        for action in self.actions:
+            if id(action) in seen:
+                continue
+            if action['required']:
+                raise Fallback
+            default = action['default']
+            if isinstance(default, str):
+                default = self.__convert(action, default, check=False)
+            if not hasattr(namespace, action['dest']):
+                setattr(namespace, action['dest'], default)
+        for dest, value in values.items():
+            setattr(namespace, dest, value)
+
+        return namespace
+
+    def __is_option(self, arg):
+        return arg.startswith('-') and arg != '-'
+
+    def __take_option(self, argv, index, values, seen):
+        arg = argv[index]
+        index += 1
+
+        explicit = None
+        if arg in self.options:
+            action = self.options[arg]
+        elif '=' in arg and arg.split('=', 1)[0] in self.options:
+            arg, explicit = arg.split('=', 1)
+            action = self.options[arg]
+        elif not arg.startswith('--') and arg[:2] in self.options:
+            # -fVALUE, unless it may be an abbreviation of another option
+            if any(option.startswith(arg) for option in self.options):
+                raise Fallback
+            arg, explicit = arg[:2], arg[2:]
+            action = self.options[arg]
+        else:
+            # -h, --help, abbreviations, unknown options, negative numbers, --
+            raise Fallback
+
+        if action['action'] in ('store', 'append'):
+            if explicit is None:
+                if index >= len(argv) or self.__is_option(argv[index]):
+                    raise Fallback
+                explicit = argv[index]
+                index += 1
+            value = self.__convert(action, explicit)
+            if action['action'] == 'append':
+                items = values.get(action['dest'], action['default'])
+                values[action['dest']] = list(items or []) + [value]
+            else:
+                values[action['dest']] = value
+        else:
+            if explicit is not None:
+                raise Fallback
+            if action['action'] == 'store_true':
+                values[action['dest']] = True
+            elif action['action'] == 'store_false':
+                values[action['dest']] = False
+            elif action['action'] == 'store_const':
+                values[action['dest']] = action['const']
+            elif action['action'] == 'count':
+                values[action['dest']] = (values.get(action['dest'], action['default']) or 0) + 1
+        seen.add(id(action))
+
+        return index
+
+    def __take_positionals(self, positionals, strings, final, values, seen):
+        # as argparse matches the nargs patterns of as many positional
+        # arguments as possible, greedily from left to right
+        minimums = [self.__minimum(action) for action in positionals]
+        matched = 0
+        while matched < len(positionals) and sum(minimums[:matched + 1]) <= len(strings):
+            matched += 1
+
+        index = 0
+        for i, action in enumerate(positionals[:matched]):
+            nargs = action['nargs']
+            rest = len(strings) - index - sum(minimums[i + 1:matched])
+            if nargs is None:
+                count = 1
+            elif isinstance(nargs, int):
+                count = nargs
+            elif nargs == '?':
+                count = 1 if rest >= 1 else 0
+            else:
+                count = max(rest, minimums[i])
+
+            taken = strings[index:index + count]
+            index += count
+            if nargs is None:
+                values[action['dest']] = self.__convert(action, taken[0])
+            elif nargs == '?' and not taken:
+                if not final or action['choices'] is not None:
+                    raise Fallback
+                default = action['default']
+                if isinstance(default, str):
+                    default = self.__convert(action, default)
+                values[action['dest']] = default
+            elif nargs == '?':
+                values[action['dest']] = self.__convert(action, taken[0])
+            elif nargs == '*' and not taken:
+                if not final or action['choices'] is not None:
+                    raise Fallback
+                values[action['dest']] = (action['default'] if action['default'] is not None
+                                          else [])
+            else:
+                values[action['dest']] = [self.__convert(action, string) for string in taken]
+            seen.add(id(action))
+
+        del positionals[:matched]
+        if index != len(strings):
+            # unrecognized arguments
+            raise Fallback
+
+    def __minimum(self, action):
+        nargs = action['nargs']
+        if nargs is None or nargs == '+':
+            return 1
+        if isinstance(nargs, int):
+            return nargs
+        return 0
+
+    def __convert(self, action, string, check=True):
+        try:
+            value = TYPES[action['type']](string) if action['type'] else string
+        except (TypeError, ValueError):
+            raise Fallback
+        if check and action['choices'] is not None and value not in action['choices']:
+            raise Fallback
+        return value
@@ -0,0 +1,168 @@
+"""Bundles of apps
+
+A bundle packages the library of a project created by `cliq create project`
+(with its cli modules and their commands) and cliq itself into an
+executable zipapp or a directory, both run by `python <bundle>`:
+
+  <bundle>/__main__.py           sets frozen config defaults, runs the app
+  <bundle>/<library>/...         the library, with `_manifest.py`,
+                                 `_dispatch.py` and the completion index
+                                 built for the bundle
+  <bundle>/cliq/...              cliq, without `cliq/templates`
+
+Modules are precompiled with unchecked hash-based pycs, so the interpreter
+neither compiles nor checks sources on start. A zipapp stores each `.pyc`
+next to its source, as zipimport expects; a directory stores them in
+`__pycache__`. If the interpreter does not match the pycs, sources are used.
+Before Python 3.7, pycs are checked against the mtimes of the sources.
+
+Third-party dependencies of the library are not bundled.
+"""
+
+import compileall
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipapp
+
+import cliq
+from cliq.core.completion import CompletionIndex
+from cliq.core.config import env_name
+from cliq.core.dispatch import DispatchTable
+from cliq.core.manifest import Manifest, find_command_dirs
+
+# environment variables of config discovery (see cliq.core.config) which
+# may be frozen: <APP>_<NAME>
+FREEZABLE = ('WORKSPACE', 'CEILING_DIRECTORIES')
+
+# unchecked hash-based pycs need Python 3.7. older interpreters write pycs
+# checked by the mtime of the source.
+if hasattr(py_compile, 'PycInvalidationMode'):
+    COMPILE_OPTIONS = {'invalidation_mode' : py_compile.PycInvalidationMode.UNCHECKED_HASH}
+else:
+    COMPILE_OPTIONS = {}
+
+IGNORE = shutil.ignore_patterns('__pycache__', '*.pyc', '*.pyo', '*.cliq-meta',
+                                '*.cliq-index', '*.egg-info', '.*')
+
+TEMPLATE_MAIN = """# generated by cliq bundle (version {cliq_version}) with Python {python}
+
+import cliq.core.environ
+
+# frozen defaults of config discovery. the environment still wins. they are
+# not set in os.environ, which subprocesses (other apps) would inherit.
+FROZEN = {frozen!r}
+
+cliq.core.environ.FROZEN_ENVIRON.update(FROZEN)
+
+from {package} import main
+
+main()
+"""
+
+
+class BundleError(Exception):
+    pass
+
+
+def find_package(command_dirname):
+    """Returns (root directory, package name of the cli module) of a command
+    directory, e.g. ('/src/myapp', 'myapp.main') for
+    '/src/myapp/myapp/main/command'.
+    """
+    dirname = os.path.dirname(os.path.abspath(command_dirname))     # <module>/main
+    names = []
+    while os.path.exists(os.path.join(dirname, '__init__.py')):
+        names.insert(0, os.path.basename(dirname))
+        dirname = os.path.dirname(dirname)
+
+    if len(names) < 2:
+        raise BundleError("'{}' is not in a package".format(command_dirname))
+
+    return dirname, '.'.join(names)
+
+
+class Bundler(object):
+    def __init__(self, project_path, cli=None):
+        """
+        project_path: a project created by `cliq create project`
+        cli: the cli module to run if the project has several
+        """
+        command_dirs = find_command_dirs(project_path)
+        packages = [find_package(dirname) for dirname in command_dirs]
+        if not packages:
+            raise BundleError("no command directory (main/command) in '{}'".format(project_path))
+
+        if cli is not None:
+            packages = [(root, package) for root, package in packages
+                        if package.split('.')[-2] == cli]
+            if not packages:
+                raise BundleError("no cli module '{}' in '{}'".format(cli, project_path))
+        elif len(packages) > 1:
+            raise BundleError('several cli modules: {}. choose one with --cli'.format(
+                ', '.join(sorted(package.split('.')[-2] for root, package in packages))))
+
+        self.root, self.package = packages[0]
+        self.name = self.package.split('.')[-2]
+        self.library = self.package.split('.')[0]
+
+    def frozen_environ(self, freeze):
+        """{NAME: value} => {<APP>_NAME: value}. Raises BundleError for a name
+        which is not in FREEZABLE.
+        """
+        environ = {}
+        for name, value in freeze.items():
+            if name not in FREEZABLE:
+                raise BundleError('cannot freeze {}: one of {} expected'
+                                  .format(name, ', '.join(FREEZABLE)))
+            environ[env_name(self.name, name)] = value
+        return environ
+
+    def build(self, output, directory=False, freeze=None, interpreter=None,
+              compressed=False):
+        """Writes the bundle to `output`, a zipapp or (if `directory`) a
+        directory. Returns the path of the bundle.
+        """
+        frozen = self.frozen_environ(freeze or {})
+        if os.path.exists(output) and (directory or os.path.isdir(output)):
+            raise BundleError("'{}' already exists".format(output))
+
+        staging = tempfile.mkdtemp(prefix='cliq-bundle-')
+        try:
+            self.__stage(staging, frozen)
+            if directory:
+                compileall.compile_dir(staging, quiet=1, **COMPILE_OPTIONS)
+                shutil.copytree(staging, output)
+            else:
+                compileall.compile_dir(staging, quiet=1, legacy=True, **COMPILE_OPTIONS)
+                # create_archive(compressed=...) needs Python 3.7
+                options = {'compressed' : True} if compressed else {}
+                zipapp.create_archive(staging, output, interpreter=interpreter, **options)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        return output
+
+    def __stage(self, staging, frozen):
+        # the library and cliq
+        shutil.copytree(os.path.join(self.root, self.library),
+                        os.path.join(staging, self.library), ignore=IGNORE)
+
+        cliq_dirname = os.path.dirname(cliq.__file__)
+        shutil.copytree(cliq_dirname, os.path.join(staging, 'cliq'),
+                        ignore=lambda dirname, names: IGNORE(dirname, names) | (
+                            {'templates'} if os.path.samefile(dirname, cliq_dirname) else set()))
+
+        # the manifest, the completion index and the dispatch table of the
+        # bundled command directory. a zipapp cannot write them.
+        main_dirname = os.path.join(staging, *self.package.split('.'))
+        Manifest(os.path.join(main_dirname, 'command')).build()
+        CompletionIndex(os.path.join(main_dirname, 'command')).commands()
+        DispatchTable(main_dirname).build()
+
+        with open(os.path.join(staging, '__main__.py'), 'w') as file:
+            file.write(TEMPLATE_MAIN.format(cliq_version=cliq.__version__,
+                                            python='.'.join(map(str, sys.version_info[:3])),
+                                            frozen=frozen, package=self.package))
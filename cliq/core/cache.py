@@ -0,0 +1,186 @@
+"""Result cache
+
+A result cache stores the output (stdout, stderr) and exit status of command
+runs in a directory, by default `.<app>/cache` of the workspace. Entries are
+named by the key of the run (see `make_key`). The cache is bounded by size:
+after a store, the least recently used entries are removed until the total
+size fits. A hit updates the mtime of its entry, which orders the entries.
+
+Hit and miss counts are kept in memory by `get()` and added to `_stats` by
+`save_counts()`, which `put()` calls, so that a hit does not write. They are
+approximate, as concurrent runs do not lock them.
+"""
+
+import hashlib
+import marshal
+import os
+import time
+
+from cliq.core.cachefile import write_cache
+
+CACHE_FORMAT = 1
+CACHE_DIRNAME = 'cache'
+ENTRY_SUFFIX = '.result'
+STATS_FILENAME = '_stats'
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+def make_key(*parts):
+    """Returns the hex digest of `parts`, which are marshallable."""
+    return hashlib.sha256(marshal.dumps((CACHE_FORMAT,) + parts)).hexdigest()
+
+
+def file_fingerprint(filename, content=False):
+    """Returns (filename, mtime, size) of a file, or (filename, sha256 of
+    the content) if `content`. None values if the file does not exist.
+    """
+    filename = os.path.abspath(filename)
+    try:
+        if content:
+            digest = hashlib.sha256()
+            with open(filename, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(chunk)
+            return (filename, digest.hexdigest())
+        stat = os.stat(filename)
+        return (filename, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return (filename, None)
+
+
+class ResultCache(object):
+    def __init__(self, dirname: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        dirname: the cache directory. eg) <workspace>/.<app>/cache
+        max_size: the maximum total size of the entries in bytes
+        """
+        self.dirname = dirname
+        self.max_size = max_size
+        self.__counts = {'hits' : 0, 'misses' : 0}     # not saved yet
+
+    def __filename(self, key):
+        return os.path.join(self.dirname, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Returns the entry of `key`, {'status': ..., 'stdout': bytes,
+        'stderr': bytes, 'created': ...}, or None.
+        """
+        filename = self.__filename(key)
+        try:
+            with open(filename, 'rb') as file:
+                entry = marshal.load(file)
+            if entry.get('format') != CACHE_FORMAT:
+                entry = None
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            entry = None
+
+        if entry is not None:
+            try:
+                os.utime(filename)      # most recently used
+            except OSError:
+                pass
+        self.__counts['hits' if entry is not None else 'misses'] += 1
+
+        return entry
+
+    def put(self, key, status, stdout, stderr):
+        """Stores the result of a run and evicts entries over the size limit.
+        Failures are ignored: the cache is only an optimization.
+        """
+        entry = {'format' : CACHE_FORMAT, 'status' : status, 'stdout' : stdout,
+                 'stderr' : stderr, 'created' : time.time()}
+        if not write_cache(self.__filename(key), entry):
+            return
+
+        self.evict()
+        self.save_counts()
+
+    def entries(self):
+        """Returns [(mtime, size, filename)] of the entries, oldest first."""
+        entries = []
+        try:
+            scanned = list(os.scandir(self.dirname))
+        except OSError:
+            return entries
+
+        for entry in scanned:
+            if not entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries until the total size is
+        at most `max_size`. Returns the number of removed entries.
+        """
+        entries = self.entries()
+        total = sum(size for mtime, size, filename in entries)
+        removed = 0
+        for mtime, size, filename in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        """Removes all entries and counts. Returns the number of removed
+        entries.
+        """
+        removed = 0
+        for mtime, size, filename in self.entries():
+            try:
+                os.remove(filename)
+                removed += 1
+            except OSError:
+                pass
+        try:
+            os.remove(os.path.join(self.dirname, STATS_FILENAME))
+        except OSError:
+            pass
+        self.__counts = {'hits' : 0, 'misses' : 0}
+
+        return removed
+
+    def stats(self):
+        """Returns {'entries', 'size', 'max_size', 'hits', 'misses'}."""
+        entries = self.entries()
+        stats = {
+            'entries' : len(entries),
+            'size' : sum(size for mtime, size, filename in entries),
+            'max_size' : self.max_size,
+        }
+        counts = self.__load_counts()
+        stats.update({name: counts[name] + self.__counts[name] for name in counts})
+        return stats
+
+    def __load_counts(self):
+        try:
+            with open(os.path.join(self.dirname, STATS_FILENAME), 'rb') as file:
+                counts = marshal.load(file)
+            return {'hits' : int(counts['hits']), 'misses' : int(counts['misses'])}
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return {'hits' : 0, 'misses' : 0}
+
+    def save_counts(self):
+        """Adds the hit and miss counts of `get()` to `_stats`."""
+        if not any(self.__counts.values()):
+            return
+        counts = self.__load_counts()
+        for name in counts:
+            counts[name] += self.__counts[name]
+        self.__counts = {'hits' : 0, 'misses' : 0}
+
+        write_cache(os.path.join(self.dirname, STATS_FILENAME), counts)
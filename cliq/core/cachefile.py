@@ -0,0 +1,34 @@
+"""Cache files
+
+Caches of cliq (command metadata, completion and plugin indexes, parsed
+config files, cached results) are marshal files. They are written to a
+temporary file which then replaces the cache, so that a reader never sees a
+partial file.
+"""
+
+import marshal
+import os
+
+
+def write_cache(filename, data):
+    """Writes `data` to the cache file `filename`, creating its directory.
+
+    Returns False if the cache could not be written. A cache is only an
+    optimization, so failures (e.g. read-only installations) are ignored.
+    """
+    tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+    try:
+        dirname = os.path.dirname(filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(tmp_filename, 'wb') as file:
+            marshal.dump(data, file)
+        os.replace(tmp_filename, filename)
+    except (OSError, ValueError):
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        return False
+
+    return True
@@ -0,0 +1,171 @@
+"""Completion index
+
+The completion index stores, for each command of a command directory, its
+description, option strings and subcommands (see cliq.core.metadata). It is
+written to `__pycache__/_completion.cliq-index` in the command directory and
+keyed by the mtime and size of the command sources, so shell completion
+does not import command modules.
+
+This module is imported by the completion fast path and only imports small
+modules. Command sources are parsed only when the index is stale.
+"""
+
+import marshal
+import os
+
+from cliq.core.cachefile import write_cache
+
+# bump with cliq.core.metadata.METADATA_FORMAT
+INDEX_FORMAT = 3
+INDEX_FILENAME = '_completion.cliq-index'
+
+# delegates of delegates are not followed further
+MAX_DELEGATES = 2
+
+
+def scan_sources(dirname):
+    """Returns {command name: source filename} of a command directory.
+
+    Private modules (`_manifest`, ...) are not commands.
+    """
+    sources = {}
+    try:
+        entries = list(os.scandir(dirname))
+    except OSError:
+        return sources
+
+    for entry in entries:
+        if entry.name.startswith('_') or entry.name.startswith('.'):
+            continue
+        if entry.name.endswith('.py') and entry.is_file():
+            sources[entry.name[:-3]] = entry.path
+        elif entry.is_dir() and '.' not in entry.name:
+            filename = os.path.join(entry.path, '__init__.py')
+            if os.path.exists(filename):
+                sources[entry.name] = filename
+
+    return sources
+
+
+class CompletionIndex(object):
+    def __init__(self, command_dirname: str, loader=None):
+        """
+        command_dirname: path to <app>/main/command
+        loader: the loader of the app package. if the command directory is
+                in an archive (a zipapp, see cliq.core.bundle), the index
+                built with the archive is read through it.
+        """
+        self.command_dirname = command_dirname
+        self.filename = os.path.join(command_dirname, '__pycache__', INDEX_FILENAME)
+        self.loader = loader
+
+    def commands(self):
+        """Returns {command name: command} of the command directory.
+
+        command: {'description': ..., 'options': {option string: choices},
+                  'arguments': [choices],
+                  'subcommands': {name: {'help': ..., 'options': ...,
+                                         'arguments': ...}}}
+
+        Stale entries are rebuilt and the index is rewritten.
+        """
+        if self.loader is not None and not os.path.isdir(self.command_dirname):
+            return self.__load_archived()
+
+        entries = self.__load()
+
+        changed = False
+        commands = {}
+        sources = scan_sources(self.command_dirname)
+        for name, filename in sources.items():
+            entry = entries.get(name)
+            if entry is None or not self.__is_fresh(entry, filename):
+                entry = self.__make_entry(filename)
+                entries[name] = entry
+                changed = True
+            commands[name] = entry['command']
+
+        for name in list(entries):
+            if name not in sources:
+                del entries[name]
+                changed = True
+
+        if changed:
+            write_cache(self.filename, {'format' : INDEX_FORMAT, 'entries' : entries})
+
+        return commands
+
+    def __load(self):
+        try:
+            with open(self.filename, 'rb') as file:
+                index = marshal.load(file)
+            if index['format'] == INDEX_FORMAT:
+                return index['entries']
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            pass
+
+        return {}
+
+    def __load_archived(self):
+        # sources in an archive do not change. the index is used as it is.
+        try:
+            index = marshal.loads(self.loader.get_data(self.filename))
+            if index['format'] == INDEX_FORMAT:
+                return {name: entry['command'] for name, entry in index['entries'].items()}
+        except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError):
+            pass
+
+        return {}
+
+    def __is_fresh(self, entry, filename):
+        # entry['sources']: [(filename, mtime, size)] of the command source
+        # and its delegates
+        if entry['sources'][0][0] != filename:
+            return False
+
+        for source, mtime, size in entry['sources']:
+            try:
+                stat = os.stat(source)
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime or stat.st_size != size:
+                return False
+
+        return True
+
+    def __make_entry(self, filename):
+        # parse the source (and the modules it delegates to)
+        import importlib.util
+        from cliq.core.metadata import read_metadata
+
+        sources = []
+        command = {'description' : '', 'options' : {}, 'arguments' : [], 'subcommands' : {}}
+        for depth in range(MAX_DELEGATES + 1):
+            try:
+                stat = os.stat(filename)
+                metadata = read_metadata(filename)
+            except (OSError, SyntaxError, ValueError):
+                break
+            sources.append((filename, stat.st_mtime_ns, stat.st_size))
+
+            setup = metadata['setup']
+            if isinstance(setup, dict) and not command['description']:
+                command['description'] = str(setup.get('description', ''))
+            command['options'].update(metadata['options'])
+            command['arguments'].extend(metadata['arguments'])
+            command['subcommands'].update(metadata['subcommands'])
+
+            if metadata['delegate'] is None:
+                break
+            try:
+                spec = importlib.util.find_spec(metadata['delegate'])
+            except (ImportError, ValueError):
+                spec = None
+            if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+                break
+            filename = spec.origin
+
+        if not sources:
+            sources.append((filename, None, None))
+
+        return {'sources' : sources, 'command' : command}
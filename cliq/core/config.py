@@ -1,8 +1,28 @@
 """Config handling"""
 
 import configparser
+import contextlib
+import marshal
 import os.path
 import sys
+import time
+
+from cliq.core.cachefile import write_cache
+from cliq.core.environ import FROZEN_ENVIRON, env_name, getenv
+
+try:
+    import fcntl
+except ImportError:     # Windows: no advisory locking
+    fcntl = None
+
+CACHE_FORMAT = 1
+
+DEFAULT_LOCK_TIMEOUT = 10.0
+
+
+class ConfigLockTimeout(Exception):
+    """Raised if a config file stays locked by another process too long."""
+
 
 class ConfigFinder(object):
     def __init__(self, program_name: str, cwd: str, config_basename='config'):
@@ -80,20 +100,39 @@ class ConfigFinder(object):
         """Find `.program_name` directory. Iterate recursively the parents of the
         current working directory up to the root.
 
+          - `<PROGRAM>_WORKSPACE`: the workspace directory (which contains
+            `.program_name`). Skips the search.
+          - `<PROGRAM>_CEILING_DIRECTORIES`: a list of directories separated
+            by `os.pathsep`. The search does not go up into them, as
+            `GIT_CEILING_DIRECTORIES` of git.
         """
         config_dirname = '.' + self.program_name
-        curdir = self.cwd
+
+        workspace = getenv(self.program_name, 'WORKSPACE')
+        if workspace:
+            dotdirpath = os.path.join(os.path.abspath(workspace), config_dirname)
+            if os.path.isdir(dotdirpath):
+                return dotdirpath
+            raise OSError
+
+        # resolved as curdir is
+        ceilings = set(os.path.realpath(d) for d in
+                       getenv(self.program_name, 'CEILING_DIRECTORIES', '')
+                       .split(os.pathsep) if d)
+
+        # resolve symbolic links once. the parents are then found by dirname.
+        curdir = os.path.realpath(self.cwd)
         while True:
             dotdirpath = os.path.join(curdir, config_dirname)
-            
+
             ## if .program_name found
             if os.path.exists(dotdirpath):
                 break
             
-            pardir = os.path.realpath(os.path.join(curdir, os.pardir))
+            pardir = os.path.dirname(curdir)
     
             ## if .program_name not found
-            if pardir == curdir:
+            if pardir == curdir or pardir in ceilings:
                 raise OSError
             else:
                 curdir = pardir
@@ -109,22 +148,45 @@ class Config(configparser.ConfigParser):
                  **kwargs):
         super().__init__(*args, **kwargs)
 
+        self.lock_timeout = DEFAULT_LOCK_TIMEOUT
+        self.__local_config = None
+        self.__global_config = None
+        self.__local_data = None
+        self.__global_data = {'defaults' : {}, 'sections' : {}}
+
         if program_name is not None and cwd is not None:
             self.finder = ConfigFinder(program_name, cwd, config_basename)
-            self.read(self.finder.global_config_filename)
-            try:
-                self.read(self.finder.local_config_filename)
-            except:
-                pass
-            
+            self.__read_files()
+
+    def __read_files(self):
+        # the merged view (self) and the per-scope views (global_config,
+        # local_config) share a single parse of each file
+        self.__global_data = read_config_data(self.finder.global_config_filename)
+        try:
+            self.__local_data = read_config_data(self.finder.local_config_filename)
+        except OSError:
+            self.__local_data = None
+
+        load_config_data(self, self.__global_data)
+        if self.__local_data is not None:
+            load_config_data(self, self.__local_data)
+
+    def reload(self):
+        """Reads the config files again, e.g. after they are updated.
+        """
+        self.clear()
+        self.defaults().clear()
         self.__local_config = None
         self.__global_config = None
+        self.__read_files()
         
     @property
     def local_config(self):
         if self.__local_config is None:
+            if self.__local_data is None:
+                self.finder.local_config_filename   # raises OSError
             self.__local_config = configparser.ConfigParser()
-            self.__local_config.read(self.finder.local_config_filename)
+            load_config_data(self.__local_config, self.__local_data)
 
         return self.__local_config
 
@@ -132,56 +194,216 @@ class Config(configparser.ConfigParser):
     def global_config(self):
         if self.__global_config is None:
             self.__global_config = configparser.ConfigParser()
-            self.__global_config.read(self.finder.global_config_filename)
+            load_config_data(self.__global_config, self.__global_data)
 
         return self.__global_config
         
     def set_local(self, section, option, value): 
-        try:
-            self.__update_local_config_file('set', section, option, value)
-        except configparser.NoSectionError:
-            self.__update_local_config_file('add_section', section)
-            self.__update_local_config_file('set', section, option, value)
+        with self.transaction('local') as tx:
+            tx.set(section, option, value)
             
     def set_global(self, section, option, value):
-        try:
-            self.__update_global_config_file('set', section, option, value)
-        except configparser.NoSectionError:
-            self.__update_global_config_file('add_section', section)
-            self.__update_global_config_file('set', section, option, value)
+        with self.transaction('global') as tx:
+            tx.set(section, option, value)
         
     def unset_local(self, section, option, value):
-        try:
-            self.__update_local_config_file('remove_option', section, option)
-        except configparser.NoSectionError:
-            pass
+        with self.transaction('local') as tx:
+            tx.unset(section, option)
         
     def unset_global(self, section, option, value):
-        try:
-            self.__update_global_config_file('remove_option', section, option)
-        except configparser.NoSectionError:
-            pass
-        
-    def __update_local_config_file(self, func: str, *args):
-        self.__update_config_file(self.finder.local_config_filename, func, *args)
-        
-    def __update_global_config_file(self, func: str, *args):
-        self.__update_config_file(self.finder.global_config_filename, func, *args)
+        with self.transaction('global') as tx:
+            tx.unset(section, option)
+
+    @contextlib.contextmanager
+    def transaction(self, scope: str = 'local'):
+        """Updates the local or global config file with many changes at once.
+
+        ```
+        with config.transaction('local') as tx:
+            tx.set('user', 'name', 'yourname')
+            tx.unset('user', 'email')
+        ```
+
+        The changes are applied in one read-modify-write of the file when the
+        block exits without an exception.
+        """
+        if scope == 'local':
+            config_filename = self.finder.local_config_filename
+        elif scope == 'global':
+            config_filename = self.finder.global_config_filename
+        else:
+            raise ValueError('scope should be local or global: {}'.format(scope))
+
+        tx = ConfigTransaction()
+        yield tx
+
+        if tx.changes:
+            self.__update_config_file(config_filename, tx.changes)
         
-    def __update_config_file(self, config_filename, func: str, *args):
+    def __update_config_file(self, config_filename, changes):
+        # other processes may update the same file: lock it during
+        # read-modify-write, otherwise one of the updates is lost.
+        with lock_config_file(config_filename, self.lock_timeout):
+            self.__update_locked_config_file(config_filename, changes)
+
+        # the app may run more commands (e.g. --batch)
+        self.reload()
+
+    def __update_locked_config_file(self, config_filename, changes):
         # read target config file 
         config = configparser.ConfigParser()
 
         config.read(config_filename)
         
         # update
-        getattr(config, func)(*args)
+        for change in changes:
+            if change[0] == 'set':
+                func, section, option, value = change
+                if section != config.default_section and not config.has_section(section):
+                    config.add_section(section)
+                config.set(section, option, value)
+            elif change[0] == 'unset':
+                func, section, option = change
+                if section == config.default_section or config.has_section(section):
+                    config.remove_option(section, option)
 
         # write target config file
-        with open(config_filename, 'w') as configfile:
-            config.write(configfile)
+        write_config_file(config_filename, config)
 
-       
 
+class ConfigTransaction(object):
+    """Changes to a config file. See `Config.transaction`.
+    """
+    def __init__(self):
+        self.changes = []
 
-            
+    def set(self, section, option, value):
+        self.changes.append(('set', section, option, value))
+
+    def unset(self, section, option):
+        self.changes.append(('unset', section, option))
+
+
+@contextlib.contextmanager
+def lock_config_file(config_filename, timeout=DEFAULT_LOCK_TIMEOUT):
+    """Holds an exclusive advisory lock (flock) on `<config>.lock` for
+    read-modify-write of a config file. Raises ConfigLockTimeout if the lock
+    cannot be acquired in `timeout` seconds.
+
+    The config file itself is not locked because it is replaced on write.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = os.open(config_filename + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise ConfigLockTimeout('fatal: {} is locked by another process'
+                                            .format(config_filename))
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+        yield
+    finally:
+        os.close(fd)     # releases the lock
+
+
+def write_config_file(config_filename, parser):
+    """Writes a config file atomically: a temporary file in the same directory
+    is renamed to the config file, so that readers see either the old or the
+    new file, never a partially written one. Updates the parse cache.
+    """
+    dirname, basename = os.path.split(config_filename)
+    tmp_filename = os.path.join(dirname, '.{}.{}.tmp'.format(basename, os.getpid()))
+    try:
+        with open(tmp_filename, 'w') as configfile:
+            parser.write(configfile)
+            configfile.flush()
+            os.fsync(configfile.fileno())
+        try:
+            os.chmod(tmp_filename, os.stat(config_filename).st_mode & 0o7777)
+        except OSError:
+            pass
+        os.replace(tmp_filename, config_filename)
+    except BaseException:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
+
+    stat = os.stat(config_filename)
+    write_config_cache(config_filename, dump_config_data(parser),
+                       [stat.st_mtime_ns, stat.st_size, stat.st_ino])
+
+
+def cache_filename(config_filename):
+    """Returns the path of the parse cache of a config file: `<config>.cache`
+    """
+    return config_filename + '.cache'
+
+
+def read_config_data(config_filename):
+    """Parses a config file and returns its raw data:
+
+      {'defaults': {option: value}, 'sections': {section: {option: value}}}
+
+    The data is cached in `<config>.cache` (marshal), keyed by the mtime,
+    size and inode of the config file. Raises OSError if the config file
+    does not exist.
+    """
+    stat = os.stat(config_filename)
+    key = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+    try:
+        with open(cache_filename(config_filename), 'rb') as file:
+            cached = marshal.load(file)
+        if cached['format'] == CACHE_FORMAT and cached['key'] == key:
+            return cached['data']
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+
+    parser = configparser.ConfigParser()
+    parser.read(config_filename)
+    data = dump_config_data(parser)
+
+    write_config_cache(config_filename, data, key)
+
+    return data
+
+
+def write_config_cache(config_filename, data, key):
+    write_cache(cache_filename(config_filename),
+                {'format' : CACHE_FORMAT, 'key' : key, 'data' : data})
+
+
+def dump_config_data(parser):
+    """Returns the raw (not interpolated) data of a config parser.
+    """
+    # _defaults and _sections hold raw values. the public API would interpolate
+    # values or merge defaults into every section.
+    return {
+        'defaults' : dict(parser._defaults),
+        'sections' : {section : dict(options) for section, options in parser._sections.items()},
+    }
+
+
+def load_config_data(parser, data):
+    """Loads raw data returned by `read_config_data` into a config parser, as
+    `parser.read()` would do with the file.
+    """
+    # values are stored without validating interpolation syntax, as read()
+    # does. ConfigParser.set() would reject e.g. a single '%'.
+    parser._defaults.update(data['defaults'])
+    for section, options in data['sections'].items():
+        if not parser.has_section(section):
+            parser.add_section(section)
+        parser._sections[section].update(options)
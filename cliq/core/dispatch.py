@@ -0,0 +1,94 @@
+"""Static dispatch table
+
+A dispatch table is a generated module `_dispatch.py` in `<app>/main/` which
+maps each command name to the `module:function` creating the command, with
+its description. `Commander` dispatches commands and prints help from it
+without scanning, stat-ing or importing the command directory.
+
+The table is written by `cliq create` and `cliq build`. Commands added
+since are still found dynamically, and `main/command/__init__.py` is checked
+for a main command again if its mtime or size has changed since. Set
+`<APP>_DEV=1` to ignore the table while developing.
+"""
+
+import ast
+import os
+import pprint
+
+import cliq
+from cliq.core.manifest import Manifest
+
+DISPATCH_MODNAME = '_dispatch'
+
+TEMPLATE_DISPATCH = """# generated by cliq (version {cliq_version}). do not edit.
+# rebuild with `cliq build <path>`
+
+# True if main/command/__init__.py defines a main command, and the mtime and
+# size of main/command/__init__.py then
+MAIN = {main}
+MAIN_SOURCE = {main_source}
+
+COMMANDS = {commands}
+"""
+
+
+def source_stamp(filename):
+    """Returns (mtime, size) of `filename`, or None if it cannot be stat-ed.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def defines_main_command(filename):
+    """Returns True if the module defines `init` or `main` at module level
+    (see `Commander.__has_main_command`).
+    """
+    try:
+        with open(filename, 'rb') as file:
+            tree = ast.parse(file.read(), filename)
+    except (OSError, SyntaxError, ValueError):
+        return False
+
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, ast.Assign):
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+
+    return 'init' in names or 'main' in names
+
+
+class DispatchTable(object):
+    def __init__(self, main_dirname: str):
+        """
+        main_dirname: path to <app>/main
+        """
+        self.main_dirname = main_dirname
+        self.command_dirname = os.path.join(main_dirname, 'command')
+        self.filename = os.path.join(main_dirname, DISPATCH_MODNAME + '.py')
+
+    def build(self):
+        """Writes the dispatch table of the command directory to `_dispatch.py`
+        and returns {command name: entry}.
+        """
+        commands = {}
+        for name, entry in Manifest(self.command_dirname).commands().items():
+            commands[name] = {
+                'target' : '.command.{}:init'.format(name),
+                'description' : entry['description'],
+            }
+
+        main_filename = os.path.join(self.command_dirname, '__init__.py')
+        main = defines_main_command(main_filename)
+        with open(self.filename, 'w') as file:
+            file.write(TEMPLATE_DISPATCH.format(cliq_version=cliq.__version__, main=main,
+                                                main_source=source_stamp(main_filename),
+                                                commands=pprint.pformat(commands)))
+
+        return commands
@@ -0,0 +1,26 @@
+"""Environment variables of apps
+
+An app reads environment variables named `<APP>_<SUFFIX>`, e.g.
+`MYAPP_WORKSPACE`. This module imports only `os`, so that modules run before
+the app is imported (cliq.main.client, cliq.main.completion) can use it.
+`env_name` and `getenv` are also available from cliq.core.config.
+"""
+
+import os
+
+# defaults of environment variables frozen into a bundle (see
+# cliq.core.bundle). they are not exported to subprocesses.
+FROZEN_ENVIRON = {}
+
+
+def env_name(program_name, suffix):
+    """myapp, WORKSPACE => MYAPP_WORKSPACE"""
+    return program_name.upper().replace('-', '_') + '_' + suffix
+
+
+def getenv(program_name, suffix, default=None):
+    """Returns the environment variable <PROGRAM>_<SUFFIX>, or its frozen
+    default.
+    """
+    name = env_name(program_name, suffix)
+    return os.environ.get(name, FROZEN_ENVIRON.get(name, default))
@@ -0,0 +1,117 @@
+"""Import time of command modules
+
+`measure()` imports a module in a clean interpreter with `-X importtime`,
+after a baseline of modules every run of the app imports anyway, and
+returns the tree of imports it triggered. Times are in microseconds, as
+reported by the interpreter.
+"""
+
+import os
+import subprocess
+import sys
+
+PREFIX = 'import time:'
+MARKER = '-- cliq importtime --'
+
+SCRIPT = """import sys
+for name in {baseline!r}:
+    __import__(name)
+sys.stderr.write({marker!r} + '\\n')
+sys.stderr.flush()
+__import__({module!r})
+"""
+
+
+class ImportTimeError(Exception):
+    pass
+
+
+class Import(object):
+    def __init__(self, name, self_us, cumulative_us, children=None):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children or []
+
+    def walk(self):
+        """Yields this import and all imports below it.
+        """
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def parse(lines):
+    """Parses `-X importtime` lines into a list of top-level `Import`s.
+
+    The interpreter prints an import after the imports it triggered, which
+    are indented two more spaces.
+    """
+    pending = []   # [(depth, Import)]
+    for line in lines:
+        if not line.startswith(PREFIX):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len(PREFIX):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue    # the header
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+
+        children = []
+        while pending and pending[-1][0] > depth:
+            children.append(pending.pop()[1])
+        children.reverse()
+        pending.append((depth, Import(name.strip(), self_us, cumulative_us, children)))
+
+    return [node for depth, node in pending]
+
+
+def measure(module, baseline=(), python=None, env=None):
+    """Imports `module` in a new interpreter after the modules in `baseline`
+    and returns the `Import`s it triggered.
+
+    Raises ImportTimeError if the import fails.
+    """
+    script = SCRIPT.format(baseline=list(baseline), marker=MARKER, module=module)
+    process = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', script],
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             env=env if env is not None else os.environ.copy())
+
+    lines = process.stderr.splitlines()
+    if process.returncode != 0:
+        errors = [line for line in lines if not line.startswith(PREFIX)]
+        raise ImportTimeError(errors[-1] if errors else 'exit {}'.format(process.returncode))
+
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    return parse(lines)
+
+
+def total_us(imports):
+    """Total import time of top-level `Import`s."""
+    return sum(node.cumulative_us for node in imports)
+
+
+def find(imports, name):
+    """Returns the `Import` of the module `name`, or None."""
+    for top in imports:
+        for node in top.walk():
+            if node.name == name:
+                return node
+    return None
+
+
+def by_package(imports, exclude=()):
+    """Returns [(top-level package, self time)] sorted by self time, largest
+    first. Packages in `exclude` are left out.
+    """
+    times = {}
+    for top in imports:
+        for node in top.walk():
+            package = node.name.split('.')[0]
+            if package not in exclude:
+                times[package] = times.get(package, 0) + node.self_us
+
+    return sorted(times.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,164 @@
+"""Command manifest
+
+A manifest is a generated module `_manifest.py` in `<app>/main/command/`
+which stores the name, description and version of each command. It lets
+`Commander` list commands without importing every command module. Each
+entry records the mtime and size of its source file, so that a stale entry
+is detected with a single `os.stat` and reloaded.
+"""
+
+import importlib.util
+import os
+import pkgutil
+import pprint
+
+import cliq
+from cliq.core.metadata import read_metadata
+
+MANIFEST_MODNAME = '_manifest'
+
+TEMPLATE_MANIFEST = """# generated by cliq (version {cliq_version}). do not edit.
+# rebuild with `cliq build <path>`
+
+COMMANDS = {commands}
+"""
+
+
+def load_setup(filename):
+    """Loads a command module from `filename` and returns its `_setup_`.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    spec = importlib.util.spec_from_file_location('_cliq_manifest_' + stem, filename)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return getattr(mod, '_setup_', {})
+
+
+def read_setup(filename):
+    """Returns the `_setup_` of a command module. The module is imported only
+    if `_setup_` cannot be read from its source statically.
+    """
+    try:
+        setup = read_metadata(filename)['setup']
+    except (OSError, SyntaxError, ValueError, TypeError):
+        setup = None
+
+    if setup is None:
+        setup = load_setup(filename)
+
+    return setup
+
+
+class Manifest(object):
+    def __init__(self, command_dirname: str):
+        """
+        command_dirname: path to <app>/main/command
+        """
+        self.command_dirname = command_dirname
+        self.filename = os.path.join(command_dirname, MANIFEST_MODNAME + '.py')
+        self.__entries = None
+
+    @property
+    def entries(self):
+        """Entries stored in the manifest file. Empty if there is no manifest.
+        """
+        if self.__entries is None:
+            self.__entries = self.__load()
+
+        return self.__entries
+
+    def __load(self):
+        if not os.path.exists(self.filename):
+            return {}
+
+        # load through the import system to use the bytecode cache
+        spec = importlib.util.spec_from_file_location('_cliq_manifest', self.filename)
+        mod = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(mod)
+            return dict(mod.COMMANDS)
+        except Exception:
+            return {}
+
+    def sources(self):
+        """Returns {command name: source filename} of the command directory.
+
+        Private modules (`_manifest`, ...) are not commands.
+        """
+        sources = {}
+        for module_info in pkgutil.iter_modules([self.command_dirname]):
+            if module_info.name.startswith('_'):
+                continue
+            if module_info.ispkg:
+                filename = os.path.join(self.command_dirname, module_info.name, '__init__.py')
+            else:
+                filename = os.path.join(self.command_dirname, module_info.name + '.py')
+            sources[module_info.name] = filename
+
+        return sources
+
+    def commands(self, loader=None):
+        """Returns {command name: entry} for all commands in the directory.
+
+        An entry is up to date if the mtime and size of its source file are
+        unchanged. Otherwise (or if missing) the entry is rebuilt by
+        `loader(name, filename)`, which returns the `_setup_` of the command.
+        """
+        if loader is None:
+            loader = lambda name, filename: read_setup(filename)
+
+        commands = {}
+        for name, filename in self.sources().items():
+            entry = self.entries.get(name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                stat = None
+
+            if (entry is None or stat is None
+                or entry.get('mtime') != stat.st_mtime_ns
+                or entry.get('size') != stat.st_size):
+                entry = self.__make_entry(loader(name, filename), stat)
+
+            commands[name] = entry
+
+        return commands
+
+    def __make_entry(self, setup, stat):
+        if not isinstance(setup, dict):
+            setup = {}
+
+        return {
+            'description' : setup.get('description', ''),
+            'version' : setup.get('version', ''),
+            'mtime' : stat.st_mtime_ns if stat is not None else None,
+            'size' : stat.st_size if stat is not None else None,
+        }
+
+    def build(self, loader=None):
+        """Rebuilds the manifest and writes it to `_manifest.py`.
+        """
+        commands = self.commands(loader)
+        with open(self.filename, 'w') as file:
+            file.write(TEMPLATE_MANIFEST.format(cliq_version=cliq.__version__,
+                                                commands=pprint.pformat(commands)))
+        self.__entries = commands
+
+        return commands
+
+
+def find_command_dirs(path):
+    """Finds command directories (`main/command`) at or below `path`.
+    """
+    path = os.path.abspath(path)
+    if os.path.basename(path) == 'command' and os.path.basename(os.path.dirname(path)) == 'main':
+        return [path]
+
+    found = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != '__pycache__')
+        if os.path.basename(dirpath) == 'command' and os.path.basename(os.path.dirname(dirpath)) == 'main':
+            found.append(dirpath)
+            dirnames[:] = []
+
+    return found
@@ -0,0 +1,268 @@
+"""Command metadata
+
+Reads the `_setup_` dict, the docstring and the argument parsers (option
+strings and subcommands, for shell completion) of a command module by
+parsing its source, without importing the module (and its dependencies).
+
+Results are cached in `__pycache__/<module>.cliq-meta` next to the source
+file and keyed by the mtime and size of the source, as Python does for
+bytecode.
+"""
+
+import ast
+import marshal
+import os
+
+from cliq.core.argspec import compile_arguments, SpecError
+from cliq.core.cachefile import write_cache
+
+METADATA_FORMAT = 4
+
+
+def cache_from_source(filename):
+    """Returns the path of the metadata cache file of a source file.
+    """
+    dirname, basename = os.path.split(filename)
+    stem = os.path.splitext(basename)[0]
+    return os.path.join(dirname, '__pycache__', stem + '.cliq-meta')
+
+
+def parse_metadata(source, filename='<unknown>'):
+    """Parses a command module source and returns its metadata.
+
+    - setup: the `_setup_` dict, or None if `_setup_` is not a literal
+             (the module has to be imported to get it)
+    - doc: the module docstring
+    - options: {option string: choices or None} of the command parser
+    - arguments: [choices or None] of the positional arguments
+    - subcommands: {name: {'help': help, 'options': options,
+                   'arguments': arguments}} added by `add_parser()` calls
+                   and `@subcommand` methods
+    - delegate: the module name if `init()` returns `<module>.init(app)`,
+                as the `init` and `config` commands of generated apps do
+    - parser: the parser table compiled from `_setup_['arguments']` (see
+              cliq.core.argspec), or None
+    """
+    tree = ast.parse(source, filename)
+
+    visitor = _ParserVisitor()
+    visitor.visit(tree)
+
+    metadata = {
+        'setup' : {},
+        'doc' : ast.get_docstring(tree),
+        'options' : visitor.options,
+        'arguments' : visitor.arguments,
+        'subcommands' : visitor.subcommands,
+        'delegate' : _find_delegate(tree),
+        'parser' : None,
+    }
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets = [node.target]
+        else:
+            continue
+
+        if any(isinstance(target, ast.Name) and target.id == '_setup_' for target in targets):
+            try:
+                metadata['setup'] = ast.literal_eval(node.value)
+            except (ValueError, TypeError):     # e.g. an unhashable key
+                metadata['setup'] = None
+
+    setup = metadata['setup']
+    if isinstance(setup, dict) and 'arguments' in setup:
+        try:
+            metadata['parser'] = compile_arguments(setup['arguments'])
+        except SpecError:
+            # argparse reports the error when the command runs
+            pass
+        else:
+            _add_declared_arguments(metadata, setup['arguments'])
+
+    return metadata
+
+
+def _add_declared_arguments(metadata, arguments):
+    # options and positional arguments of `_setup_['arguments']`
+    for argument in arguments:
+        choices = argument.get('choices')
+        choices = [str(choice) for choice in choices] if choices is not None else None
+        names = argument['names']
+        if names[0].startswith('-'):
+            for name in names:
+                metadata['options'][name] = choices
+        else:
+            metadata['arguments'].append(choices)
+
+
+class _ParserVisitor(ast.NodeVisitor):
+    # collects add_argument() and add_parser() calls in source order.
+    #
+    #   sub_parser = self.add_parser('sub', help='...')
+    #   sub_parser.add_argument('-f', '--format', choices=['a', 'b'])
+    #   self.parser.add_argument('-q', '--quiet')
+    #
+    #   @subcommand('sub', help='...')
+    #   def sub_parser(self, parser):
+    #       parser.add_argument('-f', '--format', choices=['a', 'b'])
+    def __init__(self):
+        self.options = {}
+        self.arguments = []
+        self.subcommands = {}
+        self.__owners = {}    # variable name => subcommand name
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        owner = self.__owner_of_call(node.value)
+        if owner is not False:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.__owners[target.id] = owner
+
+    def visit_FunctionDef(self, node):
+        name = None
+        for decorator in node.decorator_list:
+            if (isinstance(decorator, ast.Call) and decorator.args
+                and getattr(decorator.func, 'id', getattr(decorator.func, 'attr', None)) == 'subcommand'):
+                name = self.__add_subcommand(decorator)
+
+        if name is None or len(node.args.args) < 2:
+            self.generic_visit(node)
+            return
+
+        # the parser argument of a @subcommand method
+        parser = node.args.args[1].arg
+        previous = self.__owners.get(parser)
+        self.__owners[parser] = name
+        self.generic_visit(node)
+        self.__owners[parser] = previous
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.func, ast.Attribute) or node.func.attr != 'add_argument':
+            return
+
+        strings = [_literal(arg) for arg in node.args]
+        strings = [string for string in strings if isinstance(string, str)]
+        choices = _literal(_keyword(node, 'choices'))
+        if not isinstance(choices, (list, tuple)):
+            choices = None
+        else:
+            choices = [str(choice) for choice in choices]
+
+        owner = self.__owner(node.func.value)
+        if owner is None:
+            options, arguments = self.options, self.arguments
+        else:
+            options, arguments = (self.subcommands[owner]['options'],
+                                  self.subcommands[owner]['arguments'])
+
+        if len(strings) == 1 and not strings[0].startswith('-'):
+            arguments.append(choices)
+        for string in strings:
+            if string.startswith('-'):
+                options[string] = choices
+
+    def __owner_of_call(self, node):
+        # subcommand name (or None for the command parser) of a parser or a
+        # group returned by the call. False if not a parser.
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Attribute):
+            return False
+
+        if node.func.attr == 'add_parser':
+            name = self.__add_subcommand(node)
+            return False if name is None else name
+        elif node.func.attr in ('add_argument_group', 'add_mutually_exclusive_group'):
+            return self.__owner(node.func.value)
+
+        return False
+
+    def __add_subcommand(self, call):
+        # add_parser('sub', help='...') or @subcommand('sub', help='...')
+        name = _literal(call.args[0]) if call.args else None
+        if not isinstance(name, str):
+            return None
+        help = _literal(_keyword(call, 'help'))
+        self.subcommands.setdefault(name, {
+            'help' : help if isinstance(help, str) else '',
+            'options' : {},
+            'arguments' : [],
+        })
+        return name
+
+    def __owner(self, node):
+        if isinstance(node, ast.Name):
+            return self.__owners.get(node.id)
+        return None
+
+
+def _keyword(call, name):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def _literal(node):
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError):
+        return None
+
+
+def _find_delegate(tree):
+    # def init(app):
+    #     return cliq.main.command.config.init(app)
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == 'init':
+            for stmt in node.body:
+                if (isinstance(stmt, ast.Return)
+                    and isinstance(stmt.value, ast.Call)
+                    and isinstance(stmt.value.func, ast.Attribute)
+                    and stmt.value.func.attr == 'init'):
+                    parts = []
+                    value = stmt.value.func.value
+                    while isinstance(value, ast.Attribute):
+                        parts.insert(0, value.attr)
+                        value = value.value
+                    if isinstance(value, ast.Name):
+                        return '.'.join([value.id] + parts)
+    return None
+
+
+def read_metadata(filename):
+    """Returns the metadata of a command module source file.
+
+    Raises OSError if the source file cannot be read and SyntaxError if it
+    cannot be parsed.
+    """
+    stat = os.stat(filename)
+    cache_filename = cache_from_source(filename)
+
+    try:
+        with open(cache_filename, 'rb') as file:
+            cached = marshal.load(file)
+        if (cached['format'] == METADATA_FORMAT
+            and cached['mtime'] == stat.st_mtime_ns
+            and cached['size'] == stat.st_size):
+            return cached['metadata']
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+
+    with open(filename, 'rb') as file:
+        source = file.read()
+
+    metadata = parse_metadata(source, filename)
+    write_cache(cache_filename, {
+        'format' : METADATA_FORMAT,
+        'mtime' : stat.st_mtime_ns,
+        'size' : stat.st_size,
+        'metadata' : metadata,
+    })
+
+    return metadata
@@ -0,0 +1,92 @@
+"""Parallel map
+
+`parallel_map(fn, items)` calls `fn` on the items in a pool of threads or
+processes and yields the results in the order of the items. A result is
+yielded as soon as it and the results before it are ready, so output can
+be written while later items are still running:
+
+    for name, size in parallel_map(measure, filenames, workers=8):
+        print(name, size)
+
+Items are read lazily: at most a few chunks per worker are submitted ahead
+of the consumer, so `items` may be a long or endless iterator. An exception
+raised by `fn` is raised where its result would be yielded. Then, or when
+the consumer stops early or Ctrl-C is pressed, the items not yet started are
+cancelled. Calls already running in threads run to the end.
+
+`mode='process'` runs `fn` in processes, which needs `fn`, the items and
+the results to be picklable (`fn` defined at module level). Calls are sent
+to processes in chunks of `chunksize` items, which saves the cost of a
+round trip per item when items are many and small.
+"""
+
+import collections
+import itertools
+import os
+
+MODES = ('thread', 'process')
+PREFETCH = 2        # chunks per worker submitted ahead
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def parallel_map(fn, items, workers=None, mode='thread', chunksize=1):
+    """Yields `fn(item)` for each of `items` in order, computed by `workers`
+    threads or processes (default: the number of CPUs).
+    """
+    if mode not in MODES:
+        raise ValueError('mode must be one of {}: {!r}'.format(', '.join(MODES), mode))
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1: {}'.format(chunksize))
+    if workers is None:
+        workers = default_workers()
+    if workers < 1:
+        raise ValueError('workers must be at least 1: {}'.format(workers))
+
+    if workers == 1:
+        # no pool for a single worker
+        return (fn(item) for item in items)
+
+    return _map(fn, items, workers, mode, chunksize)
+
+
+def _map(fn, items, workers, mode, chunksize):
+    # concurrent.futures is imported only if a pool is used
+    if mode == 'process':
+        from concurrent.futures import ProcessPoolExecutor as Executor
+    else:
+        from concurrent.futures import ThreadPoolExecutor as Executor
+
+    iterator = iter(items)
+    chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+
+    executor = Executor(max_workers=workers)
+    pending = collections.deque()
+    finished = False
+    try:
+        for chunk in itertools.islice(chunks, workers * PREFETCH):
+            pending.append(executor.submit(_call, fn, chunk))
+
+        while pending:
+            results = pending.popleft().result()
+            # keep the workers busy while the consumer handles the results
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(executor.submit(_call, fn, chunk))
+            yield from results
+
+        finished = True
+    finally:
+        if finished:
+            executor.shutdown(wait=True)
+        else:
+            # shutdown(cancel_futures=True) needs Python 3.9
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+def _call(fn, chunk):
+    # module level to be picklable
+    return [fn(item) for item in chunk]
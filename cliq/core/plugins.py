@@ -0,0 +1,143 @@
+"""Plugin commands
+
+Installed distributions may contribute commands to an app through the
+entry-point group `<app>.commands`. The name of an entry point is the
+command name and its value the module (and optionally the function, by
+default `init`) creating the command:
+
+    # setup.py of a plugin of myapp
+    entry_points = {
+        'myapp.commands': [
+            'hello = myplugin.hello:init',
+        ],
+    }
+
+Scanning the metadata of installed distributions is slow, so found plugins
+are cached in `__pycache__/_plugins.cliq-index` of the command directory.
+The cache is keyed by the mtimes of the directories on `sys.path`, which
+change when distributions are installed or removed. The first entry, the
+directory of the script or the current directory, is not part of the key:
+it differs between runs of the same installation.
+"""
+
+import marshal
+import os
+import sys
+
+from cliq.core.cachefile import write_cache
+
+PLUGINS_FORMAT = 1
+PLUGINS_FILENAME = '_plugins.cliq-index'
+
+
+def group_name(app_name):
+    """myapp => myapp.commands"""
+    return app_name + '.commands'
+
+
+def search_path():
+    """Returns sys.path without the directory of the script (or the current
+    directory), which Python puts first unless run with -P.
+    """
+    if sys.path and not getattr(sys.flags, 'safe_path', False):
+        return sys.path[1:]
+    return list(sys.path)
+
+
+def path_key(path=None):
+    """Returns [(directory, mtime)] of the directories on `path` (default:
+    search_path()).
+    """
+    key = []
+    for dirname in (search_path() if path is None else path):
+        if not dirname:
+            continue
+        try:
+            stat = os.stat(dirname)
+        except OSError:
+            continue
+        key.append((dirname, stat.st_mtime_ns))
+    return key
+
+
+def scan_entry_points(group):
+    """Returns {command name: {'target': 'module:function', 'description':
+    ..., 'distribution': ...}} of the entry points in `group`.
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            from importlib_metadata import entry_points
+        except ImportError:
+            return {}
+
+    try:
+        found = entry_points(group=group)
+    except TypeError:   # Python < 3.10
+        found = entry_points().get(group, [])
+
+    commands = {}
+    for entry_point in found:
+        if entry_point.name in commands:
+            continue
+        module, _, function = entry_point.value.partition(':')
+        module, function = module.strip(), function.strip() or 'init'
+        dist = getattr(entry_point, 'dist', None)
+        commands[entry_point.name] = {
+            'target' : module + ':' + function,
+            'description' : _description(module),
+            'distribution' : dist.metadata['Name'] if dist is not None else '',
+        }
+
+    return commands
+
+
+def _description(module):
+    # the description from the literal _setup_ of the module source. the
+    # module is not imported, but its parent packages are.
+    import importlib.util
+    from cliq.core.metadata import read_metadata
+
+    try:
+        spec = importlib.util.find_spec(module)
+        setup = read_metadata(spec.origin)['setup']
+    except Exception:
+        return ''
+    return str(setup.get('description', '')) if isinstance(setup, dict) else ''
+
+
+class PluginIndex(object):
+    def __init__(self, app_name: str, command_dirname: str):
+        """
+        app_name: the name of the app. eg) myapp
+        command_dirname: path to <app>/main/command, where the cache is written
+        """
+        self.group = group_name(app_name)
+        self.filename = os.path.join(command_dirname, '__pycache__', PLUGINS_FILENAME)
+
+    def commands(self):
+        """Returns the plugin commands, {command name: {'target': ...,
+        'description': ..., 'distribution': ...}}. Entry points are scanned
+        only if the cache is stale.
+        """
+        key = path_key()
+        cache = self.__load()
+        if cache is not None and cache['group'] == self.group and cache['key'] == key:
+            return cache['commands']
+
+        commands = scan_entry_points(self.group)
+        write_cache(self.filename, {'format' : PLUGINS_FORMAT, 'group' : self.group,
+                                    'key' : key, 'commands' : commands})
+        return commands
+
+    def __load(self):
+        try:
+            with open(self.filename, 'rb') as file:
+                cache = marshal.load(file)
+            if cache['format'] == PLUGINS_FORMAT:
+                return cache
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            pass
+
+        return None
@@ -0,0 +1,342 @@
+"""Workspace state store
+
+A store is a SQLite database, by default `.<app>/store.sqlite3` of the
+workspace (`app.store`), in WAL mode unless configured otherwise. It offers
+
+- namespaces: key/value mappings of JSON values
+
+      counters = app.store.namespace('counters')
+      counters['runs'] = counters.get('runs', 0) + 1
+
+- tables: rows with declared columns and secondary indexes
+
+      runs = app.store.table('runs', columns={'command': 'TEXT', 'status': 'INTEGER'},
+                             indexes=[['command'], ['status', 'command']])
+      runs.insert({'command': 'say', 'status': 0})
+      runs.find(command='say', order_by='-status', limit=10)
+
+Statements commit on their own. `batch()` groups writes into one
+transaction, which is faster and atomic:
+
+      with app.store.batch():
+          for row in rows:
+              runs.insert(row)
+
+Concurrent processes may use the same store: readers do not block the
+writer in WAL mode, and a writer waits up to `timeout` seconds for another
+writer. The database is opened on first use.
+
+WAL needs shared memory between the processes, which network file systems
+(NFS) do not provide safely. There, use `journal_mode='delete'` (the config
+value `store.journal_mode` of an app), with which readers and the writer
+lock each other out. If WAL cannot be enabled, the store falls back to it.
+"""
+
+import contextlib
+import json
+import os
+import re
+import sqlite3
+
+STORE_FILENAME = 'store.sqlite3'
+
+DEFAULT_TIMEOUT = 10.0
+
+COLUMN_TYPES = ('TEXT', 'INTEGER', 'REAL', 'BLOB', 'NUMERIC')
+
+JOURNAL_MODES = ('wal', 'delete', 'truncate', 'persist')
+DEFAULT_JOURNAL_MODE = 'wal'
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class StoreError(Exception):
+    pass
+
+
+def _identifier(name):
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise StoreError('invalid name: {!r}'.format(name))
+    return name
+
+
+def _quote(column):
+    # columns may be SQL keywords (e.g. limit)
+    return '"{}"'.format(column)
+
+
+class Store(object):
+    def __init__(self, filename: str, timeout: float = DEFAULT_TIMEOUT,
+                 journal_mode: str = DEFAULT_JOURNAL_MODE):
+        """
+        filename: the database file. eg) <workspace>/.<app>/store.sqlite3
+        timeout: seconds to wait for another writer
+        journal_mode: 'wal', or 'delete' (or 'truncate', 'persist') on
+                      network file systems
+        """
+        if journal_mode.lower() not in JOURNAL_MODES:
+            raise StoreError('invalid journal mode: {}'.format(journal_mode))
+        self.filename = filename
+        self.timeout = timeout
+        self.journal_mode = journal_mode.lower()
+        self.__connection = None
+        self.__depth = 0
+
+    @property
+    def connection(self):
+        """The sqlite3 connection, opened on first use."""
+        if self.__connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            connection = sqlite3.connect(self.filename, timeout=self.timeout,
+                                         isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            self.__set_journal_mode(connection)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS kv ('
+                               'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, '
+                               'PRIMARY KEY (namespace, key)) WITHOUT ROWID')
+            self.__connection = connection
+
+        return self.__connection
+
+    def __set_journal_mode(self, connection):
+        # the pragma returns the mode in effect, which stays the old one if
+        # WAL is not supported (e.g. no shared memory)
+        try:
+            mode = connection.execute('PRAGMA journal_mode=' + self.journal_mode).fetchone()[0]
+        except sqlite3.OperationalError:
+            mode = None
+        if mode != self.journal_mode:
+            self.journal_mode = connection.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+
+    def execute(self, sql, parameters=()):
+        return self.connection.execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.connection.executemany(sql, parameters)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Runs the writes in the block in one transaction, which is rolled
+        back if the block raises. Batches may be nested.
+        """
+        if self.__depth == 0:
+            # take the write lock now, not at the first write, so that the
+            # transaction does not fail on a lock upgrade
+            self.execute('BEGIN IMMEDIATE')
+        self.__depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.execute('ROLLBACK')
+            raise
+        else:
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.execute('COMMIT')
+
+    def namespace(self, name):
+        """Returns the key/value `Namespace` `name`."""
+        return Namespace(self, name)
+
+    def table(self, name, columns=None, indexes=None):
+        """Returns the `Table` `name`, created or extended with `columns`
+        ({column: type}) and `indexes` ([[column, ...], ...]).
+        """
+        return Table(self, name, columns or {}, indexes or [])
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+
+class Namespace(object):
+    """A key/value mapping of JSON values in a store."""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def get(self, key, default=None):
+        row = self.store.execute('SELECT value FROM kv WHERE namespace = ? AND key = ?',
+                                 (self.name, key)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, key, value):
+        self.store.execute('INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)',
+                           (self.name, key, json.dumps(value)))
+
+    def update(self, items):
+        """Sets many keys in one transaction."""
+        if hasattr(items, 'items'):
+            items = items.items()
+        with self.store.batch():
+            self.store.executemany(
+                'INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)',
+                [(self.name, key, json.dumps(value)) for key, value in items])
+
+    def delete(self, key):
+        """Deletes `key`. Returns True if it existed."""
+        cursor = self.store.execute('DELETE FROM kv WHERE namespace = ? AND key = ?',
+                                    (self.name, key))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        self.store.execute('DELETE FROM kv WHERE namespace = ?', (self.name,))
+
+    def keys(self, prefix=''):
+        """Returns the keys starting with `prefix`, sorted."""
+        return [key for key, value in self.__select(prefix, 'key')]
+
+    def items(self, prefix=''):
+        """Returns [(key, value)] of the keys starting with `prefix`, sorted."""
+        return [(key, json.loads(value)) for key, value in self.__select(prefix, 'key, value')]
+
+    def __select(self, prefix, columns):
+        # keys in [prefix, prefix + U+10FFFF) use the primary key index
+        sql = 'SELECT key, {} FROM kv WHERE namespace = ?'.format(columns)
+        parameters = [self.name]
+        if prefix:
+            sql += ' AND key >= ? AND key < ?'
+            parameters += [prefix, prefix + '\U0010ffff']
+        rows = self.store.execute(sql + ' ORDER BY key', parameters).fetchall()
+        return [(row[0], row[-1]) for row in rows]
+
+    def __getitem__(self, key):
+        row = self.store.execute('SELECT value FROM kv WHERE namespace = ? AND key = ?',
+                                 (self.name, key)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.store.execute('SELECT 1 FROM kv WHERE namespace = ? AND key = ?',
+                                  (self.name, key)).fetchone() is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.store.execute('SELECT COUNT(*) FROM kv WHERE namespace = ?',
+                                  (self.name,)).fetchone()[0]
+
+
+class Table(object):
+    """Rows with declared columns and an integer `id`."""
+
+    def __init__(self, store, name, columns, indexes):
+        self.store = store
+        self.name = _identifier(name)
+        self.sql_name = 't_' + self.name
+        self.columns = self.__create(columns, indexes)
+
+    def __create(self, columns, indexes):
+        for column, type in columns.items():
+            _identifier(column)
+            if not isinstance(type, str) or type.upper() not in COLUMN_TYPES:
+                raise StoreError('invalid column type: {}'.format(type))
+
+        with self.store.batch():
+            self.store.execute('CREATE TABLE IF NOT EXISTS {} (id INTEGER PRIMARY KEY)'
+                               .format(self.sql_name))
+            existing = [row['name'] for row in
+                        self.store.execute('PRAGMA table_info({})'.format(self.sql_name))]
+            for column, type in columns.items():
+                if column not in existing:
+                    self.store.execute('ALTER TABLE {} ADD COLUMN {} {}'
+                                       .format(self.sql_name, _quote(column), type.upper()))
+                    existing.append(column)
+
+            for index in indexes:
+                index = [_identifier(column) for column in index]
+                unknown = [column for column in index if column not in existing]
+                if unknown:
+                    raise StoreError('index of unknown columns: {}'.format(', '.join(unknown)))
+                self.store.execute('CREATE INDEX IF NOT EXISTS {}__{} ON {} ({})'.format(
+                    self.sql_name, '__'.join(index), self.sql_name,
+                    ', '.join(_quote(column) for column in index)))
+
+        return existing
+
+    def __check(self, names):
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise StoreError('unknown columns of {}: {}'.format(self.name, ', '.join(unknown)))
+
+    def __where(self, where):
+        self.__check(where)
+        if not where:
+            return '', []
+        clauses = ['{} IS ?'.format(_quote(column)) for column in where]
+        return ' WHERE ' + ' AND '.join(clauses), list(where.values())
+
+    def insert(self, row):
+        """Inserts a row (a dict) and returns its id."""
+        self.__check(row)
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.sql_name, ', '.join(_quote(column) for column in row), ', '.join('?' * len(row)))
+        if not row:
+            sql = 'INSERT INTO {} DEFAULT VALUES'.format(self.sql_name)
+        return self.store.execute(sql, list(row.values())).lastrowid
+
+    def insert_many(self, rows):
+        """Inserts rows in one transaction."""
+        with self.store.batch():
+            for row in rows:
+                self.insert(row)
+
+    def get(self, id):
+        """Returns the row `id` as a dict, or None."""
+        row = self.store.execute('SELECT * FROM {} WHERE id = ?'.format(self.sql_name),
+                                 (id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def find(self, where=None, *, order_by=None, limit=None, **columns):
+        """Returns the rows whose columns equal `where` ({column: value}) and
+        `columns`, as dicts. Columns named `where`, `order_by` or `limit` are
+        given in `where`.
+
+        order_by: a column, or '-column' for descending order
+        """
+        sql, parameters = self.__where(dict(where or {}, **columns))
+        sql = 'SELECT * FROM {}'.format(self.sql_name) + sql
+        if order_by is not None:
+            column = order_by.lstrip('-')
+            self.__check([column])
+            sql += ' ORDER BY {}{}'.format(_quote(column),
+                                           ' DESC' if order_by.startswith('-') else '')
+        if limit is not None:
+            sql += ' LIMIT {:d}'.format(limit)
+        return [dict(row) for row in self.store.execute(sql, parameters)]
+
+    def count(self, where=None, **columns):
+        sql, parameters = self.__where(dict(where or {}, **columns))
+        return self.store.execute('SELECT COUNT(*) FROM {}'.format(self.sql_name) + sql,
+                                  parameters).fetchone()[0]
+
+    def update(self, id, **values):
+        """Updates columns of the row `id`. Returns True if it exists."""
+        self.__check(values)
+        if not values:
+            return self.get(id) is not None
+        sql = 'UPDATE {} SET {} WHERE id = ?'.format(
+            self.sql_name, ', '.join('{} = ?'.format(_quote(column)) for column in values))
+        return self.store.execute(sql, list(values.values()) + [id]).rowcount > 0
+
+    def delete(self, where=None, **columns):
+        """Deletes the rows whose columns equal `where` and `columns` (all
+        rows if none). Returns the number of deleted rows.
+        """
+        sql, parameters = self.__where(dict(where or {}, **columns))
+        return self.store.execute('DELETE FROM {}'.format(self.sql_name) + sql,
+                                  parameters).rowcount
@@ -0,0 +1,288 @@
+"""File watcher
+
+A `Watcher` waits for changes of files and directory trees:
+
+    watcher = Watcher(['src', 'data.csv'])
+    while True:
+        changed = watcher.wait()     # blocks, then returns the changed paths
+        ...
+
+On Linux, changes are read from inotify (through ctypes, without a
+dependency). Elsewhere, or if inotify is not available (e.g. some network
+file systems) or `poll` is requested, the trees are scanned every
+`interval` seconds with `os.scandir` and compared by mtime and size.
+
+Changes come in bursts: an editor saving a file, a build writing many
+files. After the first change, `wait()` collects changes until none has
+come for `debounce` seconds and returns them together.
+
+Hidden files and directories (such as the workspace directory `.<app>`),
+`__pycache__` and editor backup and swap files are not watched, unless they
+are given explicitly.
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+
+DEFAULT_DEBOUNCE = 0.1
+DEFAULT_INTERVAL = 0.5
+MAX_DELAY = 1.0         # seconds a burst may delay `wait()`
+
+IGNORED_SUFFIXES = ('~', '.swp', '.swx', '.tmp')
+IGNORED_NAMES = ('__pycache__', '4913')     # vim probes a directory with 4913
+
+
+def ignored(name):
+    """Returns True if changes of the file or directory `name` are ignored."""
+    return name.startswith('.') or name in IGNORED_NAMES or name.endswith(IGNORED_SUFFIXES)
+
+
+class Watcher(object):
+    def __init__(self, paths, debounce: float = DEFAULT_DEBOUNCE, poll: bool = False,
+                 interval: float = DEFAULT_INTERVAL):
+        """
+        paths: files and directories to watch. directories are watched
+               recursively. raises OSError if a path does not exist.
+        debounce: seconds without changes which end a burst
+        poll: scan the paths instead of using inotify
+        interval: seconds between scans
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        for path in self.paths:
+            os.stat(path)
+        self.debounce = debounce
+
+        self.__backend = None
+        if not poll and sys.platform.startswith('linux'):
+            try:
+                self.__backend = _Inotify(self.paths)
+            except (OSError, AttributeError):
+                pass
+        if self.__backend is None:
+            self.__backend = _Poller(self.paths, interval)
+
+    @property
+    def method(self):
+        """'inotify' or 'poll'"""
+        return self.__backend.method
+
+    def wait(self, timeout=None):
+        """Waits for changes and returns the sorted changed paths, or [] if
+        nothing changed in `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+            changed |= self.__backend.read(remaining)
+
+        # coalesce the burst
+        end = time.monotonic() + MAX_DELAY
+        while time.monotonic() < end:
+            more = self.__backend.read(self.debounce)
+            if not more:
+                break
+            changed |= more
+
+        return sorted(changed)
+
+    def close(self):
+        self.__backend.close()
+
+
+class _Inotify(object):
+    method = 'inotify'
+
+    # <sys/inotify.h>
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    EVENT = struct.Struct('iIII')   # wd, mask, cookie, len (of the name)
+
+    def __init__(self, paths):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.__add_watch = libc.inotify_add_watch
+        self.__add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.__get_errno = ctypes.get_errno
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+
+        self.paths = paths
+        self.__dirnames = {}        # watch descriptor => directory
+        self.__trees = set()        # directories watched with all their files
+        self.__files = set()        # files watched in the directory of each
+        try:
+            for path in paths:
+                if os.path.isdir(path):
+                    self.__watch_tree(path)
+                else:
+                    # watch the directory: editors replace files on save
+                    self.__watch(os.path.dirname(path))
+                    self.__files.add(path)
+        except OSError:
+            self.close()
+            raise
+
+    def __watch(self, dirname):
+        wd = self.__add_watch(self.fd, os.fsencode(dirname), self.MASK)
+        if wd < 0:
+            errno = self.__get_errno()
+            raise OSError(errno, os.strerror(errno), dirname)
+        self.__dirnames[wd] = dirname
+
+    def __watch_tree(self, dirname):
+        self.__watch(dirname)
+        self.__trees.add(dirname)
+        try:
+            entries = list(os.scandir(dirname))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not ignored(entry.name):
+                try:
+                    self.__watch_tree(entry.path)
+                except OSError:     # removed meanwhile
+                    pass
+
+    def read(self, timeout):
+        """Returns the paths changed within `timeout` seconds (None: until
+        a change).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            changed |= self.__parse(data)
+
+        return changed
+
+    def __parse(self, data):
+        changed = set()
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost
+                changed.update(self.paths)
+                continue
+
+            dirname = self.__dirnames.get(wd)
+            if dirname is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self.__dirnames[wd]
+                self.__trees.discard(dirname)
+                continue
+
+            if not name:    # the directory itself
+                if dirname in self.__trees:
+                    changed.add(dirname)
+                continue
+
+            path = os.path.join(dirname, name)
+            if path in self.__files:
+                changed.add(path)
+            elif dirname in self.__trees and not ignored(name):
+                changed.add(path)
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    try:
+                        self.__watch_tree(path)
+                    except OSError:
+                        pass
+
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _Poller(object):
+    method = 'poll'
+
+    def __init__(self, paths, interval):
+        self.paths = paths
+        self.interval = interval
+        self.__snapshot = self.__scan()
+
+    def __scan(self):
+        # {path: (mtime, size)} of the files
+        snapshot = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if os.path.isdir(path):
+                self.__scan_tree(path, snapshot)
+            else:
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def __scan_tree(self, dirname, snapshot):
+        try:
+            entries = list(os.scandir(dirname))
+        except OSError:
+            return
+        for entry in entries:
+            if ignored(entry.name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self.__scan_tree(entry.path, snapshot)
+                else:
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+
+    def read(self, timeout):
+        """Returns the paths changed since the last scan, after waiting
+        `interval` seconds (at most `timeout`).
+        """
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        snapshot = self.__scan()
+        changed = set(path for path in snapshot.keys() | self.__snapshot.keys()
+                      if snapshot.get(path) != self.__snapshot.get(path))
+        self.__snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
@@ -12,10 +12,12 @@ import sys
 import os
 import subprocess
 import argparse
+import time
 
 import cliq
 from cliq.main import commander
-from cliq.core.config import Config, ConfigFinder
+from cliq.main.hooks import Hooks
+from cliq.core.config import Config, ConfigFinder, env_name
 
 
 class App(object):
@@ -23,6 +25,9 @@ class App(object):
         """
         package: package name. eg) <myapp>.main or <mylib>.<mycli>.main
         """
+        # for `--profile` (see cliq.main.profiler)
+        self.timestamps = {'init' : time.perf_counter(), 'init_cpu' : time.process_time()}
+
         self.__package__ = package
         self.name = package.split('.')[-2]
         
@@ -39,6 +44,7 @@ class App(object):
                 self.version = 'unknown'
 
         self.critical_failure = False 
+        self.status = 0
         self.errors = []
         self.warnings = []
 
@@ -47,27 +53,84 @@ class App(object):
         self.commander = commander.Commander(self)
 
         self.__config = None
+        self.__store = None
+        self.profiler = None
+        self.jobs = None        # `-j N` (see Command.parallel_map)
+        self.hooks = Hooks(self.name)
+        self.__sinks_installed = False
+
+        self.timestamps['ready'] = time.perf_counter()
 
     @property
     def config(self):
         if self.__config is None:
             try:
-                self.__config = Config(self.name, self.cwd)
+                if self.profiler is not None:
+                    with self.profiler.phase('config'):
+                        self.__config = Config(self.name, self.cwd)
+                else:
+                    self.__config = Config(self.name, self.cwd)
             except:
                 raise Exception('fatal: not a {} workspace (or any of the parent directories): .{}'.format(self.app.name, self.app.name))
             
         return self.__config
+
+    @property
+    def store(self):
+        """The state store of the workspace (see cliq.core.store), opened
+        on first use.
+        """
+        if self.__store is None:
+            from cliq.core.store import STORE_FILENAME, Store
+            try:
+                dotdirname = self.config.finder.local_config_dirname
+            except OSError:
+                raise Exception('fatal: not a {} workspace (or any of the parent directories): .{}'.format(self.name, self.name))
+            self.__store = Store(os.path.join(dotdirname, STORE_FILENAME),
+                                 journal_mode=self.config.get('store', 'journal_mode',
+                                                              fallback='wal'))
+
+        return self.__store
         
     def run(self, argv=None):
+        """Runs the app with `argv`. Returns the exit status.
+        """
         if argv is None:
             argv = sys.argv[1:]
-            
-        self.commander.run(argv)
 
-    def exit(self):
-        """Exits the program. Checks errors and warnings.
+        # sinks of lifecycle events requested by the environment, which an
+        # app server sets per request
+        if not self.__sinks_installed:
+            self.__sinks_installed = True
+            if self.__sinks_requested():
+                from cliq.main import sinks
+                sinks.install(self)
+
+        self.timestamps.setdefault('run', time.perf_counter())
+        self.status = self.commander.run(argv)
+        return self.status
+
+    def __sinks_requested(self):
+        return bool(os.environ.get(env_name(self.name, 'METRICS'))
+                    or os.environ.get(env_name(self.name, 'TRACE')))
+
+    def exit(self, status=None):
+        """Exits the program with `status` (default: the status of the last
+        run). Checks errors and warnings.
         """
-        pass
+        if status is None:
+            status = self.status
+
+        if self.hooks:
+            started = self.timestamps.get('init', self.timestamps.get('run'))
+            self.hooks.emit('on_exit', status=status,
+                            duration=time.perf_counter() - started if started else None)
+
+        if self.__store is not None:
+            self.__store.close()
+
+        self.commander.close()
+        sys.exit(status)
 
 
 def main(argv=None):
@@ -76,6 +139,11 @@ def main(argv=None):
     if argv is None:
         argv = sys.argv[1:]
 
+    from cliq.main import completion
+    shell = completion.requested(__package__)
+    if shell is not None:
+        sys.exit(completion.complete(__package__, shell, argv))
+
     app = App(__package__)
     app.run(argv)
     app.exit()
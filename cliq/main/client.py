@@ -0,0 +1,205 @@
+"""client: a thin client of the app server (see cliq.main.server)
+
+An app forwards its argv, cwd, env and stdio file descriptors to a
+pre-warmed server process if the environment variable `<APP>_DAEMON` is set,
+e.g. `MYAPP_DAEMON=1 myapp say hello`. The server is started on demand.
+
+The socket is in a directory which must be owned by the user with mode
+0700, and both ends check that the peer runs as the same user
+(`SO_PEERCRED`): the client sends its environment and file descriptors, and
+the server runs whatever it is sent. Where the peer cannot be checked, the
+server is not used.
+
+This module is imported before the app itself, so it only imports small
+modules of the standard library (and cliq.core.environ).
+"""
+
+import array
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import time
+
+from cliq.core.environ import env_name
+
+STATUS = struct.Struct('!i')
+HEADER = struct.Struct('!I')
+
+RESTART = -1
+
+
+def app_name(package):
+    """<myapp>.main or <mylib>.<mycli>.main => <myapp> or <mycli>"""
+    return package.split('.')[-2]
+
+
+def enabled(package):
+    """Returns True if the app server is enabled by `<APP>_DAEMON`.
+    """
+    value = os.environ.get(env_name(app_name(package), 'DAEMON'), '')
+    return (value.lower() in ('1', 'yes', 'true', 'on')
+            and hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork')
+            and hasattr(socket, 'SO_PEERCRED'))
+
+
+def socket_path(package):
+    """Returns the per-user socket path of an app server.
+
+      - $XDG_RUNTIME_DIR/cliq/<package>.sock
+      - /tmp/cliq-<uid>/<package>.sock if XDG_RUNTIME_DIR is not set
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        dirname = os.path.join(runtime_dir, 'cliq')
+    else:
+        dirname = os.path.join('/tmp', 'cliq-{}'.format(os.getuid()))
+
+    return os.path.join(dirname, package + '.sock')
+
+
+def secure_dirname(dirname):
+    """Creates the socket directory `dirname` if missing. Returns True if it
+    is a directory (not a link) owned by the user with mode 0700.
+    """
+    try:
+        os.mkdir(dirname, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+
+    try:
+        st = os.lstat(dirname)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid()
+            and stat.S_IMODE(st.st_mode) == 0o700)
+
+
+def peer_uid(conn):
+    """Returns the uid of the process at the other end of a unix socket."""
+    pid, uid, gid = struct.unpack('3i', conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                        struct.calcsize('3i')))
+    return uid
+
+
+def recv_exactly(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def run(package, argv=None):
+    """Runs `argv` on the app server and returns the exit status.
+
+    Returns None if the server is not available. The caller should then
+    run the app in process.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    for attempt in range(2):
+        conn = connect(package)
+        if conn is None:
+            return None
+
+        with conn:
+            status = request(conn, argv)
+        if status != RESTART:
+            return status
+
+        # the server has stopped because command sources have changed.
+
+    return None
+
+
+def connect(package, timeout=5.0):
+    """Connects to the app server. Starts one if not running.
+    """
+    path = socket_path(package)
+    if not secure_dirname(os.path.dirname(path)):
+        return None
+
+    conn = _try_connect(path)
+    if conn is not None:
+        return conn
+
+    start_server(package)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn = _try_connect(path)
+        if conn is not None:
+            return conn
+        time.sleep(0.01)
+
+    return None
+
+
+def _try_connect(path):
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+        if peer_uid(conn) != os.getuid():
+            conn.close()
+            return None
+        return conn
+    except OSError:
+        conn.close()
+        return None
+
+
+def start_server(package):
+    """Starts an app server in a new session, detached from the terminal.
+    """
+    import subprocess
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    with open(os.devnull, 'r+b') as devnull:
+        subprocess.Popen([sys.executable, '-m', 'cliq.main.server', package],
+                         stdin=devnull, stdout=devnull, stderr=devnull,
+                         env=env, cwd='/', start_new_session=True)
+
+
+def request(conn, argv):
+    """Sends a request with stdio file descriptors and waits for the exit
+    status. Ctrl-C is forwarded to the worker.
+    """
+    payload = json.dumps({
+        'argv' : argv,
+        'cwd' : os.getcwd(),
+        'env' : dict(os.environ),
+    }).encode()
+
+    fds = array.array('i', [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()])
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        conn.sendmsg([HEADER.pack(len(payload)) + payload],
+                     [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+        pid, = STATUS.unpack(recv_exactly(conn, STATUS.size))
+    except (OSError, EOFError):
+        # the server is shutting down
+        return RESTART
+
+    if pid == RESTART:
+        return RESTART
+
+    while True:
+        try:
+            status, = STATUS.unpack(recv_exactly(conn, STATUS.size))
+            return status
+        except EOFError:
+            return 1
+        except KeyboardInterrupt:
+            try:
+                os.kill(pid, 2)     # SIGINT
+            except OSError:
+                return 130
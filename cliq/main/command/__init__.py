@@ -1,5 +1,7 @@
 import sys
 import argparse
+from gettext import gettext
+
 
 class Command(object):
     def __init__(self, app, name, **kwargs):
@@ -19,8 +21,107 @@ class Command(object):
         if 'formatter_class' not in kwargs:
             kwargs['formatter_class'] = argparse.RawDescriptionHelpFormatter
             
-        self.parser = argparse.ArgumentParser(prog=progname, **kwargs)
+        self.__parser_kwargs = dict(kwargs, prog=progname)
+        self.__parser = None
+
+    @property
+    def parser(self):
+        """argparse.ArgumentParser of the command, created on first use with the
+        arguments declared in `_setup_['arguments']` (see cliq.core.argspec)
+        """
+        if self.__parser is None:
+            profiler = getattr(self.app, 'profiler', None)
+            if profiler is not None:
+                with profiler.phase('parser'):
+                    self.__parser = self.__make_parser()
+            else:
+                self.__parser = self.__make_parser()
+        return self.__parser
+
+    def __make_parser(self):
+        parser = argparse.ArgumentParser(**self.__parser_kwargs)
+        arguments = self.__setup().get('arguments')
+        if arguments:
+            from cliq.core.argspec import add_arguments
+            add_arguments(parser, arguments)
+        return parser
+
+    @parser.setter
+    def parser(self, parser):
+        self.__parser = parser
+
+    def __setup(self):
+        # _setup_ of the module which defines the command class
+        setup = getattr(sys.modules.get(type(self).__module__), '_setup_', None)
+        return setup if isinstance(setup, dict) else {}
+
+    def parse_args(self, argv):
+        """Parses `argv` and returns an argparse.Namespace.
+
+        Arguments declared in `_setup_['arguments']` are parsed by a fast
+        parser without building `self.parser`, which is used only for help,
+        errors and uncommon command lines.
+        """
+        if self.__parser is None:
+            table = self.__parser_table()
+            if table is not None:
+                from cliq.core.argspec import FastParser
+                args = FastParser(table).parse(argv)
+                if args is not None:
+                    return args
+
+        return self.parser.parse_args(argv)
+
+    def __parser_table(self):
+        # the parser table is compiled and cached with the module metadata
+        setup = self.__setup()
+        if not setup.get('arguments'):
+            return None
+
+        # every command imports this module. import the parser modules only
+        # for commands which declare arguments.
+        from cliq.core.argspec import SpecError, compile_arguments
+        from cliq.core.metadata import read_metadata
+
+        filename = getattr(sys.modules.get(type(self).__module__), '__file__', None)
+        if filename is not None and filename.endswith('.py'):
+            try:
+                metadata = read_metadata(filename)
+                if metadata['setup'] == setup:
+                    return metadata['parser']
+            except (OSError, SyntaxError, ValueError):
+                pass
+
+        try:
+            return compile_arguments(setup['arguments'])
+        except SpecError:
+            return None
         
+    @property
+    def jobs(self):
+        """The default number of workers of `parallel_map`: `-j N` of the app,
+        the config value `core.jobs` or the number of CPUs
+        """
+        from cliq.core.parallel import default_workers
+
+        jobs = getattr(self.app, 'jobs', None)
+        if jobs is None and self.app is not None:
+            try:
+                jobs = int(self.app.config.get('core', 'jobs', fallback=0)) or None
+            except Exception:
+                jobs = None
+        return jobs if jobs is not None and jobs > 0 else default_workers()
+
+    def parallel_map(self, fn, items, workers=None, mode='thread', chunksize=1):
+        """Yields `fn(item)` for each of `items`, in order, computed by
+        `workers` (default: `self.jobs`) threads or processes (`mode`). See
+        cliq.core.parallel.
+        """
+        from cliq.core.parallel import parallel_map
+
+        return parallel_map(fn, items, self.jobs if workers is None else workers, mode,
+                            chunksize)
+
     def run(self, argv):
         pass
         
@@ -28,15 +129,95 @@ class SimpleCommand(Command):
     def __init__(self, app = None, name : str = '', **kwargs):
         super().__init__(app, name, **kwargs)
         
+def subcommand(name, **kwargs):
+    """Decorates a method of a ComplexCommand which sets up the parser of the
+    subcommand `name`. The method is called only when the subcommand is
+    parsed or its help is printed. `kwargs` are passed to `add_parser()`.
+
+    `func` defaults to `name`:
+
+        @subcommand('say', help='say something')
+        def say_parser(self, parser):
+            parser.add_argument('something', type=str, help='something')
+    """
+    def decorator(setup):
+        setup._subcommand_ = (name, kwargs)
+        return setup
+
+    return decorator
+
+
+class LazyArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser whose arguments are added by `setup(parser)` on first use"""
+
+    def __init__(self, *args, setup = None, add_help = True, **kwargs):
+        # adding -h/--help validates it with a HelpFormatter, which is slow.
+        # add it with the other arguments.
+        super().__init__(*args, add_help = add_help and setup is None, **kwargs)
+        self.__setup = setup
+        self.__add_help = add_help and setup is not None
+
+    def __run_setup(self):
+        if self.__setup is not None:
+            setup, self.__setup = self.__setup, None
+            if self.__add_help:
+                # as argparse.ArgumentParser.__init__ does
+                prefix = '-' if '-' in self.prefix_chars else self.prefix_chars[0]
+                self.add_argument(prefix + 'h', prefix * 2 + 'help', action='help',
+                                  default=argparse.SUPPRESS,
+                                  help=gettext('show this help message and exit'))
+            setup(self)
+
+    def parse_known_args(self, args = None, namespace = None):
+        self.__run_setup()
+        return super().parse_known_args(args, namespace)
+
+    def parse_known_intermixed_args(self, args = None, namespace = None):
+        self.__run_setup()
+        return super().parse_known_intermixed_args(args, namespace)
+
+    def format_usage(self):
+        self.__run_setup()
+        return super().format_usage()
+
+    def format_help(self):
+        self.__run_setup()
+        return super().format_help()
+
+
 class ComplexCommand(Command):
     """ComplexCommand has its own argument parser to process subcommand and subarguments"""
     
     def __init__(self, app = None, name : str = '', **kwargs):
         super().__init__(app, name, **kwargs)
-        self.subparsers = self.parser.add_subparsers(title='subcommands', help='command help')
+        self.subparsers = self.parser.add_subparsers(title='subcommands', help='command help',
+                                                     parser_class=LazyArgumentParser)
+        self.__add_subcommands()
+
+    def __add_subcommands(self):
+        # add parsers of @subcommand methods in the order of definition.
+        # a method overridden in a subclass keeps its place.
+        setups = {}
+        for cls in reversed(type(self).__mro__):
+            for attr, value in vars(cls).items():
+                if hasattr(value, '_subcommand_'):
+                    setups[attr] = value
+
+        for attr, setup in setups.items():
+            name, kwargs = setup._subcommand_
+            self.add_parser(name, setup=self.__bind_setup(name, getattr(self, attr)), **kwargs)
+
+    def __bind_setup(self, name, setup):
+        def setup_parser(parser):
+            parser.set_defaults(func=name)
+            setup(parser)
+        return setup_parser
 
-    def add_parser(self, *args, **kwargs):
-        return self.subparsers.add_parser(*args, **kwargs)
+    def add_parser(self, *args, setup = None, **kwargs):
+        """Adds the parser of a subcommand. If `setup` is given, arguments are
+        added by `setup(parser)` when the parser is first used.
+        """
+        return self.subparsers.add_parser(*args, setup=setup, **kwargs)
         
     def run(self, argv):
         if len(argv) == 0:
@@ -47,3 +228,27 @@ class ComplexCommand(Command):
 
     def print_help(self, args):
         self.parser.print_help()
+
+
+class AsyncSimpleCommand(SimpleCommand):
+    """AsyncSimpleCommand: `run` is a coroutine, driven by the event loop of the app
+    (see cliq.main.eventloop)"""
+
+    async def run(self, argv):
+        pass
+
+
+class AsyncComplexCommand(ComplexCommand):
+    """AsyncComplexCommand: `run` and subcommand functions are coroutines, driven
+    by the event loop of the app (see cliq.main.eventloop)"""
+
+    async def run(self, argv):
+        if len(argv) == 0:
+            self.parser.print_help()
+        else:
+            args = self.parser.parse_args(argv)
+            # print_help is not a coroutine
+            result = getattr(self, args.func)(args)
+            if hasattr(result, '__await__'):
+                result = await result
+            return result
@@ -0,0 +1,38 @@
+"""build-index
+"""
+
+_setup_ = {
+    'version' : '0.9.3',
+    'description' : 'Same as build, kept for compatibility'
+}
+
+__epilog__ = """
+`cliq build-index` is an alias of `cliq build`, which builds the command
+manifest, the completion index and the dispatch table of cli modules.
+
+example:
+
+  # build all cli modules in a project
+  $ cliq build-index ./myapp
+"""
+
+import sys
+from cliq.main.command.build import BuildCommand
+
+def init(app):
+    return BuildIndexCommand(app)
+
+class BuildIndexCommand(BuildCommand):
+    def __init__(self, app = None, name = 'build-index'):
+        super().__init__(app, name)
+        self.parser.epilog = __epilog__
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = BuildIndexCommand()
+    command.run(argv)
+
+if __name__ == '__main__' :
+    main()
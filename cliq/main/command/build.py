@@ -0,0 +1,72 @@
+"""build
+"""
+
+_setup_ = {
+    'version' : '0.9.3',
+    'description' : 'Build the dispatch table, command manifest and completion index of cli modules'
+}
+
+__epilog__ = """
+example:
+
+  # build all cli modules in a project
+  $ cliq build ./myapp
+
+  # build a cli module
+  $ cliq build ./myapp/myapp
+
+  # build a command directory
+  $ cliq build ./myapp/myapp/main/command
+
+The manifest (<module>/main/command/_manifest.py) and the completion index
+let the app list and complete commands without importing them. The dispatch
+table (<module>/main/_dispatch.py) lets the app run commands without
+scanning the command directory. Rebuild them after adding, removing or
+renaming commands.
+"""
+
+import os
+import sys
+from cliq.main.command import SimpleCommand
+from cliq.core.manifest import Manifest, find_command_dirs
+from cliq.core.completion import CompletionIndex
+from cliq.core.dispatch import DispatchTable
+
+def init(app):
+    return BuildCommand(app)
+
+class BuildCommand(SimpleCommand):
+    def __init__(self, app = None, name = 'build'):
+        super().__init__(app, name, epilog = __epilog__)
+
+        self.parser.add_argument('path', type=str, nargs='+',
+                                 help='project, cli module or command directory path')
+        self.parser.add_argument('-q', '--quiet', action='store_true', help='quiet')
+
+    def run(self, argv):
+        args = self.parser.parse_args(argv)
+
+        for path in args.path:
+            command_dirs = find_command_dirs(path)
+            if len(command_dirs) == 0:
+                sys.exit("fatal: no command directory (main/command) in '{}'".format(path))
+
+            for command_dir in command_dirs:
+                manifest = Manifest(command_dir)
+                commands = manifest.build()
+                CompletionIndex(command_dir).commands()
+                table = DispatchTable(os.path.dirname(command_dir))
+                table.build()
+                if not args.quiet:
+                    print('{}: {} commands'.format(manifest.filename, len(commands)))
+                    print('{}'.format(table.filename))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = BuildCommand()
+    command.run(argv)
+
+if __name__ == '__main__' :
+    main()
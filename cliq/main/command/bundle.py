@@ -0,0 +1,80 @@
+"""bundle
+"""
+
+_setup_ = {
+    'version' : '0.9.3',
+    'description' : 'Bundle a project into an executable zipapp or directory'
+}
+
+__epilog__ = """
+example:
+
+  # an executable zipapp
+  $ cliq bundle ./myapp -o myapp.pyz
+  $ ./myapp.pyz say hello
+
+  # a directory, run with python
+  $ cliq bundle ./myapp --dir -o myapp.d
+  $ python myapp.d say hello
+
+  # freeze config discovery: MYAPP_CEILING_DIRECTORIES=/home unless set
+  $ cliq bundle ./myapp --freeze CEILING_DIRECTORIES=/home
+"""
+
+import sys
+from cliq.main.command import SimpleCommand
+from cliq.core.bundle import Bundler, BundleError, FREEZABLE
+
+def init(app):
+    return BundleCommand(app)
+
+class BundleCommand(SimpleCommand):
+    def __init__(self, app = None, name = 'bundle'):
+        super().__init__(app, name, epilog = __epilog__)
+
+        self.parser.add_argument('project', type=str, help='project path')
+        self.parser.add_argument('-o', '--output', type=str,
+                                 help='bundle path. default: <cli>.pyz or <cli>.d')
+        self.parser.add_argument('--cli', type=str,
+                                 help='the cli module to run if the project has several')
+        self.parser.add_argument('--dir', action='store_true',
+                                 help='bundle into a directory instead of a zipapp')
+        self.parser.add_argument('--freeze', type=str, action='append', default=[],
+                                 metavar='NAME=VALUE',
+                                 help='default of <APP>_NAME in the bundle. NAME: {}'
+                                      .format(', '.join(FREEZABLE)))
+        self.parser.add_argument('--python', type=str, default='/usr/bin/env python3',
+                                 help='interpreter of the zipapp (default: %(default)s)')
+        self.parser.add_argument('--compress', action='store_true',
+                                 help='compress the zipapp')
+
+    def run(self, argv):
+        args = self.parser.parse_args(argv)
+
+        freeze = {}
+        for item in args.freeze:
+            name, sep, value = item.partition('=')
+            if not sep:
+                self.parser.error('--freeze: NAME=VALUE expected: {}'.format(item))
+            freeze[name] = value
+
+        try:
+            bundler = Bundler(args.project, cli=args.cli)
+            output = args.output or (bundler.name + ('.d' if args.dir else '.pyz'))
+            bundler.build(output, directory=args.dir, freeze=freeze,
+                          interpreter=None if args.dir else args.python,
+                          compressed=args.compress)
+        except BundleError as e:
+            sys.exit('fatal: {}'.format(e))
+
+        print('{}: {} ({})'.format(output, bundler.package, 'directory' if args.dir else 'zipapp'))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = BundleCommand()
+    command.run(argv)
+
+if __name__ == '__main__' :
+    main()
@@ -0,0 +1,58 @@
+"""cache
+"""
+
+_setup_ = {
+    'version' : '0.9.3',
+    'description' : 'Show or clear the result cache of the workspace'
+}
+
+__epilog__ = """
+example:
+
+  $ cliq cache stats
+  $ cliq cache clear
+
+commands with _setup_['cache'] store their results in .cliq/cache. the
+size of the cache is limited by cache.max_size (bytes):
+
+  $ cliq config cache.max_size 10000000
+"""
+
+import sys
+from cliq.main.command import ComplexCommand, subcommand
+from cliq.main.memoize import open_cache
+
+def init(app):
+    return CacheCommand(app)
+
+class CacheCommand(ComplexCommand):
+    def __init__(self, app, name = 'cache'):
+        super().__init__(app, name, epilog = __epilog__.replace('cliq', app.name))
+
+    @subcommand('stats', help='show the number and size of entries, hits and misses')
+    def stats_parser(self, parser):
+        pass
+
+    @subcommand('clear', help='remove all entries')
+    def clear_parser(self, parser):
+        pass
+
+    def __open_cache(self):
+        cache = open_cache(self.app)
+        if cache is None:
+            sys.exit('fatal: not in a {} directory'.format(self.app.name))
+        return cache
+
+    def stats(self, args):
+        stats = self.__open_cache().stats()
+        lookups = stats['hits'] + stats['misses']
+        print('entries: {}'.format(stats['entries']))
+        print('size: {} / {} bytes'.format(stats['size'], stats['max_size']))
+        print('hits: {}'.format(stats['hits']))
+        print('misses: {}'.format(stats['misses']))
+        if lookups:
+            print('hit rate: {:.1%}'.format(stats['hits'] / lookups))
+
+    def clear(self, args):
+        removed = self.__open_cache().clear()
+        print('removed {} entries'.format(removed))
@@ -0,0 +1,49 @@
+"""completion
+"""
+
+_setup_ = {
+    'version' : '0.9.3',
+    'description' : 'Print a shell completion script'
+}
+
+__epilog__ = """
+example:
+
+  # bash (~/.bashrc)
+  eval "$(cliq completion bash)"
+
+  # zsh (~/.zshrc, after compinit)
+  eval "$(cliq completion zsh)"
+
+  # fish (~/.config/fish/config.fish)
+  cliq completion fish | source
+"""
+
+import sys
+from cliq.main.command import SimpleCommand
+from cliq.main import completion
+
+def init(app):
+    return CompletionCommand(app)
+
+class CompletionCommand(SimpleCommand):
+    def __init__(self, app = None, name = 'completion'):
+        super().__init__(app, name, epilog = __epilog__)
+
+        self.parser.add_argument('shell', type=str, choices=['bash', 'zsh', 'fish'], help='shell')
+
+    def run(self, argv):
+        args = self.parser.parse_args(argv)
+
+        package = self.app.__package__ if self.app is not None else 'cliq.main'
+        sys.stdout.write(completion.script(package, args.shell))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = CompletionCommand()
+    command.run(argv)
+
+if __name__ == '__main__' :
+    main()
@@ -16,11 +16,19 @@ example:
   $ cliq config --local --list
   $ cliq config --unset user.name
   $ cliq config --global --unset user.name
+  $ printf 'user.name=yourname\nuser.email=you@example.com\n' | cliq config --set-many
+  $ cliq config --global --set-many options.txt
+  $ cliq config --get user.name user.email
+  $ cliq config --list --format json
+  $ eval "$(cliq config --list --format env)"
 """
 
 import sys
+import json
+import re
+import shlex
 from cliq.main.command import SimpleCommand
-from cliq.core.config import Config
+from cliq.core.config import Config, ConfigLockTimeout
 
 def init(app):
     return ConfigCommand(app)
@@ -37,7 +45,15 @@ class ConfigCommand(SimpleCommand):
         ## list, unset, add, get;
         ## rename-section, remove-section
         self.parser.add_argument('-l', '--list', action='store_true', help='list all options')
+        self.parser.add_argument('--get', type=str, nargs='+', metavar='NAME',
+                                 help='get the values of one or more variables')
+        self.parser.add_argument('--format', type=str, choices=['text', 'json', 'env', 'nul'],
+                                 default='text',
+                                 help='output format of --list and --get (default: text)')
         self.parser.add_argument('--unset', action='store_true', help='remove a variable: name')
+        self.parser.add_argument('--set-many', type=str, nargs='?', const='-', metavar='FILE',
+                                 help='set variables read from FILE (default: stdin), '
+                                      'one name=value per line')
                
         ## local, global
         location_group = self.parser.add_mutually_exclusive_group()
@@ -51,6 +67,12 @@ class ConfigCommand(SimpleCommand):
         #                         help='show scope of config (local, global)')
 
     def run(self, argv):
+        try:
+            return self.__run(argv)
+        except ConfigLockTimeout as e:
+            sys.exit(str(e))
+
+    def __run(self, argv):
 
         args = self.parser.parse_args(argv)
         
@@ -60,23 +82,39 @@ class ConfigCommand(SimpleCommand):
             sys.exit(str(e))
             
 
-        if args.list :
+        if args.set_many is not None:
+            if args.name is not None or args.value is not None:
+                print('error: wrong number of arguments, should be 0')
+                self.parser.print_help()
+                return 1
+
+            self.__set_many(config, args)
+        elif args.list :
             if args.name is not None or args.value is not None:
                 print('error: wrong number of arguments, should be 0')
                 self.parser.print_help()
+                return 1
                 
-                if getattr(args, 'global') :
-                    config = self.app.config.global_config
-                elif args.local:
+            if getattr(args, 'global') :
+                config = self.app.config.global_config
+            elif args.local:
+                try:
                     config = self.app.config.local_config
+                except OSError:
+                    sys.exit('fatal: not in a {} directory'.format(self.app.name))
+
+            entries = [(secname + '.' + name, config[secname][name],
+                        self.__scope(secname, name, args))
+                       for secname in config.sections()
+                       for name in config[secname]]
+            self.__print_entries(entries, args.format)
+        elif args.get is not None:
+            if args.name is not None or args.value is not None:
+                print('error: wrong number of arguments, should be 0')
+                self.parser.print_help()
+                return 1
 
-
-            # self.app.config.finder.global_config_filename
-            # self.app.config.finder.local_config_filename
-
-            for secname in config.sections():
-                for name in config[secname]:
-                    print(secname + '.' + name + '=' + config[secname][name])
+            return self.__get(config, args.get, args)
         elif args.name is not None:
             try:
                 section, name = args.name.split('.')
@@ -97,7 +135,7 @@ class ConfigCommand(SimpleCommand):
                     self.parser.print_help()
             else:
                 if args.value is None:    
-                    print(config[section][name])
+                    return self.__get(config, [args.name], args)
                 else:
                     if getattr(args, 'global'):
                         config.set_global(section, name, args.value)
@@ -108,3 +146,103 @@ class ConfigCommand(SimpleCommand):
                             sys.exit('fatal: not in a {} directory'.format(self.app.name))
         else:
             self.parser.print_help()
+
+    def __set_many(self, config, args):
+        # read name=value lines and apply them in one transaction
+        if args.set_many == '-':
+            lines = sys.stdin.readlines()
+        else:
+            try:
+                with open(args.set_many) as file:
+                    lines = file.readlines()
+            except OSError as e:
+                sys.exit('fatal: cannot read {}: {}'.format(args.set_many, e))
+
+        scope = 'global' if getattr(args, 'global') else 'local'
+        if scope == 'local':
+            try:
+                config.local_config
+            except OSError:
+                sys.exit('fatal: not in a {} directory'.format(self.app.name))
+
+        try:
+            with config.transaction(scope) as tx:
+                for line in lines:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    try:
+                        key, value = line.split('=', 1)
+                        section, name = key.strip().split('.')
+                    except ValueError:
+                        sys.exit('error: not a section.name=value line: {}'.format(line))
+                    tx.set(section, name, value.strip())
+        except OSError as e:
+            sys.exit('fatal: cannot write the {} config: {}'.format(scope, e))
+
+    def __get(self, config, keys, args):
+        # get values of many keys in one run. exit status 1 if a key is missing
+        if getattr(args, 'global'):
+            config = config.global_config
+        elif args.local:
+            try:
+                config = config.local_config
+            except OSError:
+                sys.exit('fatal: not in a {} directory'.format(self.app.name))
+
+        entries = []
+        missing = []
+        for key in keys:
+            try:
+                section, name = key.split('.')
+            except ValueError:
+                sys.exit('error: key does not contain a section: {}'.format(key))
+
+            if config.has_option(section, name):
+                entries.append((key, config[section][name], self.__scope(section, name, args)))
+            else:
+                entries.append((key, None, None))
+                missing.append(key)
+
+        if args.format == 'text':
+            # a line per key, empty if the key is missing
+            for key, value, scope in entries:
+                print(value if value is not None else '')
+        else:
+            self.__print_entries(entries, args.format)
+
+        if missing:
+            print('error: not found: {}'.format(' '.join(missing)), file=sys.stderr)
+            return 1
+
+    def __scope(self, section, name, args):
+        # local or global
+        if getattr(args, 'global'):
+            return 'global'
+        try:
+            if self.app.config.local_config.has_option(section, name):
+                return 'local'
+        except OSError:
+            pass
+        return 'global'
+
+    def __print_entries(self, entries, format):
+        # entries: [(section.name, value, scope)]. value is None if not found.
+        if format == 'json':
+            print(json.dumps({key : {'value' : value, 'scope' : scope}
+                              for key, value, scope in entries}, indent=2))
+        elif format == 'env':
+            # MYAPP_SECTION_NAME='value', to be evaluated by a shell
+            prefix = re.sub(r'\W', '_', self.app.name).upper() + '_'
+            for key, value, scope in entries:
+                if value is not None:
+                    print(prefix + re.sub(r'\W', '_', key).upper() + '=' + shlex.quote(value))
+        elif format == 'nul':
+            # section.name=value terminated by NUL. values may contain newlines
+            for key, value, scope in entries:
+                if value is not None:
+                    sys.stdout.write(key + '=' + value + '\0')
+        else:
+            for key, value, scope in entries:
+                if value is not None:
+                    print(key + '=' + value)
@@ -17,13 +17,13 @@ example:
 """
 
 TEMPLATE_PARSER = """
-        {name}_parser = self.add_parser('{name}', help='{name}')
+    @subcommand('{name}', help='{name}')
+    def {name}_parser(self, parser):
         # add arguments, for example:
         #
-        # {name}_parser.add_argument('arg', type=str, nargs='*', help='arg')
-        # {name}_parser.add_argument('-q', '--quickly', action='store_true', help='quickly')
-        # 
-        {name}_parser.set_defaults(func='{name}')
+        # parser.add_argument('arg', type=str, nargs='*', help='arg')
+        # parser.add_argument('-q', '--quickly', action='store_true', help='quickly')
+        pass
 """
 
 TEMPLATE_FUNCTION = """
@@ -38,7 +38,9 @@ TEMPLATE_FUNCTION = """
 import sys
 import shutil
 import pathlib
-from cliq.main.command import ComplexCommand
+from cliq.main.command import ComplexCommand, subcommand
+from cliq.core.manifest import Manifest, MANIFEST_MODNAME
+from cliq.core.dispatch import DispatchTable, DISPATCH_MODNAME
 import cliq.templates.command
 import cliq.templates.project
 import cliq.templates.library
@@ -52,47 +54,46 @@ class Command(ComplexCommand):
     def __init__(self, app = None, name = 'create'):
         super().__init__(app, name, epilog = __epilog__)
 
-        #
-        # project
-        #
-        project_parser = self.add_parser('project', help='create a project')
-        #project_parser.add_argument('--standalone', action='store_true', help='standalone project')
-        #project_parser.add_argument('-i', '--interactive', action='store_true',
-        #                            help='interactive')
-        project_parser.add_argument('path', type=str, help='project path')
-        project_parser.add_argument('--name', type=str, help='library name. if not specified, project name')
-        project_parser.add_argument('--cli', '--with-cli', type=str, 
-                                    help='a list of command line interface modules separate by commas')
-        project_parser.add_argument('--sample', '--with-sample-commands', action='store_true',
-                                    help='include sample commands')
-
-        project_parser.add_argument('--description', type=str, help='description in setup.py')
-        project_parser.add_argument('--keywords', type=str, help='keywords in setup.py')
-        project_parser.add_argument('--author', type=str, help='author in setup.py')
-        project_parser.add_argument('--email', type=str, help='author_email in setup.py')
-        project_parser.add_argument('--url', type=str, help='url in setup.py')
-        project_parser.add_argument('--license', type=str, help='license in setup.py')
-        
-        project_parser.set_defaults(func='project')
-
-        #
-        # module
-        #
-        module_parser = self.add_parser('module', help='add a cli module')
-        module_parser.add_argument('path', help='module path')
-        module_parser.set_defaults(func='module')
-
-        #
-        # command
-        #
-        command_parser = self.add_parser('command', help='create a command')
-        command_parser.add_argument('filename', type=str, help='a command script filename')
-        command_parser.add_argument('--sub', '--subcommands', '--with-subcommands',
-                                    type=str,
-                                    help='a list of subcommands separated by commas')
-        command_parser.add_argument('--desc', '--description', type=str,
-                                    help='description')
-        command_parser.set_defaults(func='command')
+    #
+    # project
+    #
+    @subcommand('project', help='create a project')
+    def project_parser(self, parser):
+        #parser.add_argument('--standalone', action='store_true', help='standalone project')
+        #parser.add_argument('-i', '--interactive', action='store_true',
+        #                    help='interactive')
+        parser.add_argument('path', type=str, help='project path')
+        parser.add_argument('--name', type=str, help='library name. if not specified, project name')
+        parser.add_argument('--cli', '--with-cli', type=str, 
+                            help='a list of command line interface modules separate by commas')
+        parser.add_argument('--sample', '--with-sample-commands', action='store_true',
+                            help='include sample commands')
+
+        parser.add_argument('--description', type=str, help='description in setup.py')
+        parser.add_argument('--keywords', type=str, help='keywords in setup.py')
+        parser.add_argument('--author', type=str, help='author in setup.py')
+        parser.add_argument('--email', type=str, help='author_email in setup.py')
+        parser.add_argument('--url', type=str, help='url in setup.py')
+        parser.add_argument('--license', type=str, help='license in setup.py')
+
+    #
+    # module
+    #
+    @subcommand('module', help='add a cli module')
+    def module_parser(self, parser):
+        parser.add_argument('path', help='module path')
+
+    #
+    # command
+    #
+    @subcommand('command', help='create a command')
+    def command_parser(self, parser):
+        parser.add_argument('filename', type=str, help='a command script filename')
+        parser.add_argument('--sub', '--subcommands', '--with-subcommands',
+                            type=str,
+                            help='a list of subcommands separated by commas')
+        parser.add_argument('--desc', '--description', type=str,
+                            help='description')
 
     def project(self, args):
         # paths
@@ -118,6 +119,7 @@ class Command(ComplexCommand):
             self.__create_library(lib_path)
             self.__create_module(lib_path)
             if args.sample: self.__copy_sample_commands(lib_path)
+            self.__build_manifest(lib_path)
         else:
             if args.sample :
                 print('warning: --with-sample-commands option is ignored. No sample commands for a project with mulitple cli modules.')
@@ -126,6 +128,7 @@ class Command(ComplexCommand):
             for modname in cli_names:
                 mod_path = lib_path / modname
                 self.__create_module(mod_path)
+                self.__build_manifest(mod_path)
 
         #
         # generate project files: setup.cfg setup.py README.md
@@ -237,6 +240,11 @@ class Command(ComplexCommand):
         # copy files
         for filename in sample_commands_path.glob('*.py'): 
             shutil.copy(sample_commands_path / filename, mod_command_path)
+
+    def __build_manifest(self, module_path):
+        # generate <module>/main/command/_manifest.py and <module>/main/_dispatch.py
+        Manifest(str(module_path / 'main' / 'command')).build()
+        DispatchTable(str(module_path / 'main')).build()
         
 
 
@@ -251,6 +259,7 @@ class Command(ComplexCommand):
         #    sys.exit("fatal: destination path '{}' already exists.".format(args.path))
             
         self.__create_module(mod_path)
+        self.__build_manifest(mod_path)
 
     def command(self, args):
         path = pathlib.Path(args.filename)
@@ -286,6 +295,13 @@ class Command(ComplexCommand):
         with open(path, 'w') as file:
             file.write(content)
 
+        # keep the manifest and the dispatch table up to date if the command is
+        # created in a command directory
+        if (path.parent / (MANIFEST_MODNAME + '.py')).exists():
+            Manifest(str(path.parent)).build()
+        if (path.parent.parent / (DISPATCH_MODNAME + '.py')).exists():
+            DispatchTable(str(path.parent.parent)).build()
+
 
 def main(argv=None):
     if argv is None:
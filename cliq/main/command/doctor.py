@@ -0,0 +1,103 @@
+"""doctor: diagnose apps
+"""
+
+_setup_ = {
+    'description' : 'diagnose apps',
+    'version' : '0.9.3'
+}
+
+__epilog__ = """
+example:
+  # rank the commands of myapp by import time
+  $ cliq doctor imports myapp
+
+  # a cli module of a library
+  $ cliq doctor imports mylib.mycli
+"""
+
+import sys
+from cliq.main.command import ComplexCommand, subcommand
+from cliq.core.manifest import Manifest
+from cliq.core.importtime import ImportTimeError, measure, total_us, find, by_package
+
+# modules every run of an app imports before a command (see
+# cliq/templates/module/main/__init__.py)
+BASELINE = ['cliq.main.completion', 'cliq.main.client', 'cliq.main.cli', 'cliq.main.command']
+
+def init(app):
+    return Command(app)
+
+class Command(ComplexCommand):
+    def __init__(self, app = None, name = 'doctor'):
+        super().__init__(app, name, epilog = __epilog__)
+
+    @subcommand('imports', help='rank commands by import time')
+    def imports_parser(self, parser):
+        parser.add_argument('app', type=str, help='app package. eg) myapp or mylib.mycli')
+        parser.add_argument('-n', '--repeat', type=int, default=3,
+                            help='imports per command; the fastest counts (default: 3)')
+        parser.add_argument('-t', '--threshold', type=float, default=10.0, metavar='MS',
+                            help='flag module-level imports slower than MS (default: 10)')
+        parser.add_argument('--top', type=int, default=3,
+                            help='heaviest dependencies shown per command (default: 3)')
+
+    def imports(self, args):
+        package = args.app + '.main'
+        try:
+            pkg = __import__(package + '.command', fromlist=[''])
+        except ImportError as e:
+            sys.exit('fatal: cannot import {}.command: {}'.format(package, e))
+
+        # the pkgutil enumeration of Commander._register_commands
+        commands = {}
+        for path in pkg.__path__:
+            for name in Manifest(path).sources():
+                commands.setdefault(name, package + '.command.' + name)
+
+        baseline = [package] + BASELINE + [package + '.command']
+        own = args.app.split('.')[0]
+
+        reports = []
+        for name, module in sorted(commands.items()):
+            try:
+                imports = min((measure(module, baseline) for i in range(max(args.repeat, 1))),
+                              key=total_us)
+            except ImportTimeError as e:
+                print('{}: cannot import: {}'.format(name, e), file=sys.stderr)
+                continue
+
+            node = find(imports, module)
+            heavy = [child for child in (node.children if node else [])
+                     if child.cumulative_us >= args.threshold * 1000]
+            reports.append((name, total_us(imports),
+                            by_package(imports, exclude=(own,))[:args.top], heavy))
+
+        reports.sort(key=lambda report: -report[1])
+
+        print('{:>4}  {:<20} {:>10}  {}'.format('rank', 'command', 'import ms',
+                                                'heaviest dependencies (ms)'))
+        for rank, (name, us, packages, heavy) in enumerate(reports, 1):
+            print('{:>4}  {:<20} {:>10.2f}  {}'.format(
+                rank, name, us / 1000,
+                ', '.join('{} {:.2f}'.format(package, self_us / 1000)
+                          for package, self_us in packages if self_us > 0)))
+
+        flagged = [(name, heavy) for name, us, packages, heavy in reports if heavy]
+        if flagged:
+            print()
+            print('module-level imports slower than {:g} ms; import them in run():'
+                  .format(args.threshold))
+            for name, heavy in flagged:
+                for child in heavy:
+                    print('  {}: {} ({:.2f} ms)'.format(name, child.name,
+                                                        child.cumulative_us / 1000))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = Command()
+    command.run(argv)
+
+if __name__ == '__main__' :
+    main()
@@ -3,9 +3,12 @@
 # command center
 #
 import argparse
+import json
 import os
+import shlex
 import sys
-import pkgutil
+import time
+import traceback
 
 class Commander:
     """Commander: parse arguments and dispatch commands
@@ -13,29 +16,57 @@ class Commander:
     def __init__(self, app):
         self.app = app
         
-        # parser
-        self.parser = argparse.ArgumentParser(prog=self.app.name, add_help=False)
-        self.parser._positionals.title = 'arguments'
-        self.parser.add_argument('--help', action='store_true')      # <cliq> --help
-        self.parser.add_argument('--version', action='store_true')   # <cliq> --version
-        self.subparsers = self.parser.add_subparsers(title='commands', help='command help')
+        self.__parser = None
+        self.__subparsers = None
+        self.__event_loop = None
+        self.__dispatch_table = None
+        self.__dispatch_table_loaded = False
+        self.__plugins = None
+        self.__watched = None
+
+    @property
+    def parser(self):
+        """The argument parser of the app, created on first use. `<cliq>
+        <command> ...` runs the command without it.
+        """
+        if self.__parser is None:
+            parser = argparse.ArgumentParser(prog=self.app.name, add_help=False)
+            parser._positionals.title = 'arguments'
+            parser.add_argument('--help', action='store_true')      # <cliq> --help
+            parser.add_argument('--version', action='store_true')   # <cliq> --version
+            parser.add_argument('--batch', type=str, metavar='FILE',  # <cliq> --batch FILE
+                                help='run commands read from FILE (- for stdin), one per line')
+            parser.add_argument('--profile', type=str, nargs='?', const='', metavar='FILE',
+                                help='print the time of each phase to stderr; '
+                                     'write a cProfile dump to FILE (- for a summary)')
+            parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                                help='run up to N jobs in parallel in commands which can')
+            parser.add_argument('--watch', type=str, metavar='PATHS',
+                                help='re-run the command when files in PATHS '
+                                     '(comma-separated) change')
+            self.__subparsers = parser.add_subparsers(title='commands', help='command help')
+            self.__parser = parser
+
+        return self.__parser
+
+    @property
+    def subparsers(self):
+        self.parser
+        return self.__subparsers
         
     def parse_args(self, argv):
+        """Parses `argv` with the parser of commands. Returns None if the
+        command does not exist.
+        """
+        self.parser.set_defaults(command='help')
+        return self.__parse_args(argv)
 
-        # check argv and register commands. a command should be the first argument 
-        #
-        # $ <myapp> <mycom> xxx ... => register <myapp>.main.command.<mycom>
-        #
+    def __has_main_command(self, pkg):
         # check if exists <module>/main/command/__init__.py
         #          and __init__.py defines a cliq command.
-        pkg = __import__(self.app.__package__ + '.command', fromlist=[''])
- 
-        if not hasattr(pkg, 'main') and not hasattr(pkg, 'init'):
-            self.parser.set_defaults(command='help')
-            return self.__parse_args(argv)
-        else:
-            self.__parse_args_with_main_command(pkg, argv)
-            sys.exit(0)
+        #
+        # pkg.init or pkg.main may also be an imported command module (init.py)
+        return callable(getattr(pkg, 'main', None)) or callable(getattr(pkg, 'init', None))
 
     def __parse_args(self, argv):
         # this method will process argv
@@ -44,15 +75,10 @@ class Commander:
         
         if len(argv) > 0 and not argv[0].startswith('-'):
             command = argv[0]
-            try: 
-                mod = __import__(self.app.__package__ + '.command.' + command, fromlist=[''])
-                if hasattr(mod._setup_, 'description'):
-                    self.add_command_parser(command, help=mod._setup_['description'])
-                else:
-                    self.add_command_parser(command)
-            except ModuleNotFoundError:
-                sys.exit("{app}: '{com}' is not a {app} command. See '{app} --help'"
-                         .format(app=self.app.name, com=command))
+            if self.__find_command(command) is None:
+                return None
+
+            self.add_command_parser(command, help=self.__description(command))
                    
                 
         # Use parse_known_args() to pass -h|--help option to the subparsers.
@@ -62,7 +88,7 @@ class Commander:
         args, argv = self.parser.parse_known_args(argv)   # pass -h|--help
         return args
 
-    def __parse_args_with_main_command(self, main_command_pkg, argv):
+    def __run_with_main_command(self, main_command_pkg, argv):
         # this method will process argv
         # if exists <module>/main/command/__init__.py
         #    and __init__.py contains a cliq command
@@ -74,12 +100,17 @@ class Commander:
         # change <ArgumentParser>.prog from 'myapp command' to 'myapp'
         main_command.parser.prog = self.app.name  
 
+        # <cliq> <command> ...
+        target = self.__find_command(argv[0]) if len(argv) > 0 else None
+        if target is not None:
+            return self.__run_found(argv[0], target, argv[1:])
+
         # try to parse argv with self.parser
-        # argv may contain a proper command or --help or --version
-        if len(argv) > 0 and (not argv[0].startswith('-') or argv[0] == '--help' or argv[0] == '--version'):
+        # argv may contain a proper command or --help or --version or --batch
+        if len(argv) > 0 and (not argv[0].startswith('-') or argv[0] in ('--help', '--version', '--batch')):
             try:
-               args = self.__parse_args(argv)
-            except:
+                args = self.__parse_args(argv)
+            except SystemExit:
                 args = None
         else:
             args = None
@@ -87,20 +118,16 @@ class Commander:
             
         if args and args.help:
             self.__print_help_with_main_command(main_command)
+            return 0
         elif args and args.version:
             self.print_version()
-            sys.exit()
+            return 0
+        elif args and args.batch is not None:
+            return self.run_batch(args.batch)
         elif hasattr(args, 'command'):
-            mod = __import__(self.app.__package__ + '.command.' + args.command, fromlist=[''])
-            command = mod.init(self.app)
-            command.run(argv[1:]) # args.subargv
-            sys.exit(0)
+            return self.run_command(args.command, argv[1:]) # args.subargv
         else:
-            try:   
-                main_command.run(argv)
-            except:
-                #self.__print_help_with_main_command(main_command)
-                os._exit(0)
+            return self.__run_command(main_command, argv)
 
     def __print_help_with_main_command(self, main_command):
         main_command.parser.print_help()
@@ -110,19 +137,416 @@ class Commander:
         self.print_help()
 
     def run(self, argv):
+        """Parses `argv` and runs a command. Returns the exit status.
+
+        `SystemExit` raised by a command (`sys.exit()` or argparse) is
+        converted into an exit status, so that the interpreter can run more
+        commands (see `run_batch`).
+        """
+        if self.app.hooks:
+            self.app.hooks.emit('before_parse', argv=argv)
+
+        try:
+            return self.__dispatch(argv)
+        except SystemExit as e:
+            return exit_status(e.code)
+
+    def __dispatch(self, argv):
+        # <cliq> --profile[=FILE] ...
+        if len(argv) > 0 and argv[0].split('=', 1)[0] == '--profile':
+            return self.__run_profiled(argv)
+
+        # <cliq> -j N ...
+        if len(argv) > 0 and (argv[0].startswith('-j') or
+                              argv[0].split('=', 1)[0] == '--jobs'):
+            return self.__run_with_jobs(argv)
+
+        # <cliq> --watch PATHS ...
+        if len(argv) > 0 and argv[0].split('=', 1)[0] == '--watch':
+            return self.__run_watched(argv)
+
+        # the dispatch table tells if there is a main command without
+        # importing <cliq>.main.command, unless its __init__.py has changed
+        table = self.dispatch_table
+        if table is None or table['main'] or self.__main_source_changed(table):
+            pkg = __import__(self.app.__package__ + '.command', fromlist=[''])
+            if self.__has_main_command(pkg):
+                return self.__run_with_main_command(pkg, argv)
+
+        # <cliq> <command> ... does not need the parser of the app
+        target = self.__find_command(argv[0]) if len(argv) > 0 else None
+        if target is not None:
+            return self.__run_found(argv[0], target, argv[1:])
 
         args = self.parse_args(argv)
+        if args is None:
+            return self.__not_a_command(argv[0])
 
         if args.help:
             self.print_help()
         elif args.version:
             self.print_version()
+        elif args.batch is not None:
+            return self.run_batch(args.batch)
         elif args.command == 'help' and not hasattr(args, 'subargv'):
             self.print_help()
         else:
-            mod = __import__(self.app.__package__ + '.command.' + args.command, fromlist=[''])
-            command = mod.init(self.app)
-            command.run(argv[1:]) # args.subargv
+            return self.run_command(args.command, argv[1:]) # args.subargv
+
+        return 0
+
+    def __run_profiled(self, argv):
+        # time the phases of the run (see cliq.main.profiler). a nested
+        # --profile (e.g. in a batch file) is ignored.
+        filename = argv[0].split('=', 1)[1] if '=' in argv[0] else None
+        if self.app.profiler is not None:
+            return self.__dispatch(argv[1:])
+
+        from cliq.main.profiler import Profiler
+        profiler = Profiler(filename or None)
+        profiler.start(self.app.timestamps)
+        self.app.profiler = profiler
+        try:
+            return self.__dispatch(argv[1:])
+        finally:
+            self.app.profiler = None
+            profiler.stop()
+
+    def __run_with_jobs(self, argv):
+        # -j N, -jN, --jobs N or --jobs=N sets the default number of workers
+        # of Command.parallel_map for the rest of argv
+        option = argv[0]
+        if option.startswith('--jobs='):
+            value, argv = option.split('=', 1)[1], argv[1:]
+        elif option not in ('-j', '--jobs'):
+            value, argv = option[2:], argv[1:]
+        elif len(argv) > 1:
+            value, argv = argv[1], argv[2:]
+        else:
+            value = None
+        try:
+            jobs = int(value)
+            if jobs < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            print('{}: {} requires a positive number'.format(self.app.name, option.split('=')[0]),
+                  file=sys.stderr)
+            return 2
+
+        saved, self.app.jobs = self.app.jobs, jobs
+        try:
+            return self.__dispatch(argv)
+        finally:
+            self.app.jobs = saved
+
+    def __run_watched(self, argv):
+        # re-run the command on changes (see cliq.main.watch). a nested
+        # --watch (e.g. in a batch file) is ignored.
+        if '=' in argv[0]:
+            paths, argv = argv[0].split('=', 1)[1], argv[1:]
+        elif len(argv) > 1:
+            paths, argv = argv[1], argv[2:]
+        else:
+            print('{}: --watch requires PATHS'.format(self.app.name), file=sys.stderr)
+            return 2
+        if self.__watched is not None:
+            return self.__dispatch(argv)
+
+        from cliq.main import watch
+        self.__watched = []
+        try:
+            return watch.run(self.app, [path for path in paths.split(',') if path], argv,
+                             self.__rerun)
+        finally:
+            self.__watched = None
+
+    def __rerun(self, argv):
+        # the first run dispatches argv and records the commands it runs. a
+        # single command is kept and run again. others (a batch) are
+        # dispatched again.
+        if len(self.__watched) == 1:
+            command, command_argv = self.__watched[0]
+            return self.__run_command(command, command_argv, record=False)
+        self.__watched = []
+        return self.__dispatch(argv)
+
+    @property
+    def dispatch_table(self):
+        """The static dispatch table of the app (see cliq.core.dispatch):
+        {'main': bool, 'main_source': (mtime, size), 'main_filename': ...,
+         'commands': {name: {'target': ..., 'description': ...}}}
+
+        None if the app has no table or in development mode (`<APP>_DEV`).
+        """
+        from cliq.core.config import env_name
+
+        if not self.__dispatch_table_loaded:
+            self.__dispatch_table_loaded = True
+            if not os.environ.get(env_name(self.app.name, 'DEV')):
+                try:
+                    mod = __import__(self.app.__package__ + '._dispatch', fromlist=[''])
+                    self.__dispatch_table = {
+                        'main' : mod.MAIN,
+                        # tables built before MAIN_SOURCE never match
+                        'main_source' : getattr(mod, 'MAIN_SOURCE', False),
+                        'main_filename' : os.path.join(os.path.dirname(mod.__file__),
+                                                       'command', '__init__.py'),
+                        'commands' : mod.COMMANDS,
+                    }
+                except (ImportError, AttributeError):
+                    pass
+
+        return self.__dispatch_table
+
+    def __main_source_changed(self, table):
+        # same stamp as cliq.core.dispatch.source_stamp, which is not imported
+        # on this path. sources which cannot be stat-ed (e.g. in a zipapp) do
+        # not change.
+        try:
+            stat = os.stat(table['main_filename'])
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != table['main_source']
+
+    @property
+    def plugins(self):
+        """Commands of installed plugins (see cliq.core.plugins):
+        {name: {'target': ..., 'description': ..., 'distribution': ...}}
+        """
+        if self.__plugins is None:
+            from cliq.core.plugins import PluginIndex
+            pkg = sys.modules.get(self.app.__package__) or __import__(self.app.__package__,
+                                                                      fromlist=[''])
+            path = list(getattr(pkg, '__path__', []))
+            if path:
+                self.__plugins = PluginIndex(self.app.name,
+                                             os.path.join(path[0], 'command')).commands()
+            else:
+                self.__plugins = {}
+
+        return self.__plugins
+
+    def __find_command(self, command):
+        # returns (module name, function name) of the command, or None. the
+        # module (and its dependencies) is imported only when the command runs.
+        if command.startswith('-') or command.startswith('_'):
+            return None
+        if self.app.profiler is not None:
+            with self.app.profiler.phase('lookup'):
+                return self.__find_target(command)
+        return self.__find_target(command)
+
+    def __find_target(self, command, use_table=True):
+        table = self.dispatch_table if use_table else None
+        if table is not None and command in table['commands']:
+            module, function = table['commands'][command]['target'].split(':')
+            return self.app.__package__ + module, function
+
+        # no table, or a command added after the table was built: find the
+        # command module without importing it
+        import importlib.util
+        modname = self.app.__package__ + '.command.' + command
+        try:
+            spec = importlib.util.find_spec(modname)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is not None:
+            return modname, 'init'
+
+        # commands of the app come before plugins
+        if command in self.plugins:
+            module, function = self.plugins[command]['target'].split(':')
+            return module, function
+
+        return None
+
+    def __description(self, command):
+        table = self.dispatch_table
+        if table is not None and command in table['commands']:
+            return table['commands'][command]['description']
+
+        import importlib.util
+        try:
+            spec = importlib.util.find_spec(self.app.__package__ + '.command.' + command)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            return self.plugins[command]['description']
+        return self.__load_setup(command, spec.origin).get('description', '')
+
+    def run_command(self, name, argv):
+        """Runs the command `name` with `argv`. Returns the exit status.
+        """
+        target = (self.__find_command(name)
+                  or (self.app.__package__ + '.command.' + name, 'init'))
+        return self.__run_target(target, argv)
+
+    def __run_found(self, command, target, argv):
+        # a dispatch table built before a command module was removed or
+        # renamed names a module which does not exist. find the command
+        # again without the table.
+        try:
+            return self.__run_target(target, argv)
+        except ModuleNotFoundError as e:
+            table = self.dispatch_table
+            if e.name != target[0] or table is None or command not in table['commands']:
+                raise
+
+        target = self.__find_target(command, use_table=False)
+        if target is None:
+            return self.__not_a_command(command)
+        return self.__run_target(target, argv)
+
+    def __not_a_command(self, command):
+        print("{app}: '{com}' is not a {app} command. See '{app} --help'"
+              .format(app=self.app.name, com=command), file=sys.stderr)
+        return 1
+
+    def __run_target(self, target, argv):
+        modname, function = target
+        profiler = self.app.profiler
+        if profiler is not None:
+            with profiler.phase('import'):
+                mod = __import__(modname, fromlist=[''])
+            with profiler.phase('init'):
+                command = getattr(mod, function)(self.app)
+            return self.__run_command(command, argv)
+
+        mod = __import__(modname, fromlist=[''])
+        command = getattr(mod, function)(self.app)
+        return self.__run_command(command, argv)
+
+    def __run_command(self, command, argv, record=True):
+        if self.__watched is not None and record:
+            self.__watched.append((command, argv))
+        if self.app.hooks:
+            return self.__run_with_hooks(command, argv)
+        return self.__run_phase(command, argv)
+
+    def __run_with_hooks(self, command, argv):
+        # emit lifecycle events (see cliq.main.hooks)
+        hooks = self.app.hooks
+        hooks.emit('after_parse', command=command.name, argv=argv)
+        hooks.emit('before_run', command=command.name, argv=argv)
+        started = time.perf_counter()
+        try:
+            status = self.__run_phase(command, argv)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else int(e.code is not None)
+            hooks.emit('after_run', command=command.name, status=status,
+                       duration=time.perf_counter() - started)
+            raise
+        except BaseException as e:
+            hooks.emit('on_error', command=command.name, error=e,
+                       duration=time.perf_counter() - started)
+            raise
+        hooks.emit('after_run', command=command.name, status=status,
+                   duration=time.perf_counter() - started)
+        return status
+
+    def __run_phase(self, command, argv):
+        if self.app.profiler is not None:
+            with self.app.profiler.phase('run'):
+                return self.__run(command, argv)
+        return self.__run(command, argv)
+
+    def __run(self, command, argv):
+        # commands declaring _setup_['cache'] run through the result cache
+        # of the workspace (see cliq.main.memoize)
+        setup = getattr(sys.modules.get(type(command).__module__), '_setup_', None)
+        if isinstance(setup, dict) and setup.get('cache'):
+            from cliq.main import memoize
+            options = memoize.cache_options(setup)
+            if options is not None:
+                return memoize.run(self.app, command, options, argv, self.__call)
+        return self.__call(command, argv)
+
+    def __call(self, command, argv):
+        # Command.run may return an exit status. run of an async command
+        # returns a coroutine.
+        status = command.run(argv)
+        if hasattr(status, '__await__'):
+            status = self.event_loop.run(status)
+        return status if isinstance(status, int) else 0
+
+    @property
+    def event_loop(self):
+        """The event loop of async commands (see cliq.main.eventloop), created
+        on first use and reused by later commands.
+        """
+        if self.__event_loop is None:
+            # asyncio is imported only if an async command runs
+            from cliq.main.eventloop import EventLoop
+            self.__event_loop = EventLoop()
+        return self.__event_loop
+
+    def close(self):
+        """Closes the event loop of async commands, if any.
+        """
+        if self.__event_loop is not None:
+            self.__event_loop.close()
+            self.__event_loop = None
+
+    def run_batch(self, filename):
+        """Runs commands read from `filename` (`-` for stdin) in this process.
+
+        Each line is an argv, shell-quoted or a JSON array of strings. Empty
+        lines and lines starting with `#` are skipped. After each command,
+        a delimiter line with the exit status is printed to stdout:
+
+          ==> <lineno>: exit <status>
+
+        Returns 0 if all commands succeeded, otherwise 1.
+        """
+        if filename == '-':
+            lines = sys.stdin.readlines()
+        else:
+            try:
+                with open(filename) as file:
+                    lines = file.readlines()
+            except OSError as e:
+                print('{}: cannot read batch file: {}'.format(self.app.name, e), file=sys.stderr)
+                return 1
+
+        failed = False
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            try:
+                if line.startswith('['):
+                    argv = json.loads(line)
+                    if not all(isinstance(arg, str) for arg in argv):
+                        raise ValueError('not an array of strings')
+                else:
+                    argv = shlex.split(line)
+            except ValueError as e:
+                print('{}: batch line {}: {}'.format(self.app.name, lineno, e), file=sys.stderr)
+                status = 1
+            else:
+                if '--batch' in argv[:1]:
+                    print('{}: batch line {}: nested --batch'.format(self.app.name, lineno),
+                          file=sys.stderr)
+                    status = 1
+                else:
+                    status = self.__run_batch_line(argv)
+
+            failed = failed or status != 0
+            sys.stderr.flush()
+            print('==> {}: exit {}'.format(lineno, status))
+            sys.stdout.flush()
+
+        return 1 if failed else 0
+
+    def __run_batch_line(self, argv):
+        try:
+            return self.run(argv)
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            traceback.print_exc()
+            return 1
 
     def add_command_parser(self, command: str, help: str = ''):
         """
@@ -131,6 +555,9 @@ class Commander:
         commander.add_command_parser('please', help='please command')
         ```
         """
+        if command in self.subparsers.choices:
+            return self.subparsers.choices[command]
+
         subparser = self.subparsers.add_parser(command, help=help, add_help=False)
 
         # prevent parsing subarguments
@@ -149,16 +576,48 @@ class Commander:
     def _register_commands(self):
         """registers all modules from <cliq>.main.command to self.subparsers
         """
-        pkg = __import__(self.app.__package__ + '.command', fromlist=[''])
-        for module_info in pkgutil.iter_modules(pkg.__path__):
-            if module_info.name not in self.subparsers.choices :
-                mod = __import__(self.app.__package__ + '.command.' + module_info.name, fromlist=[''])
-                try:
-                    self.add_command_parser(module_info.name, help=mod._setup_['description'])
-                except AttributeError:
-                    self.add_command_parser(module_info.name)
+        table = self.dispatch_table
+        if table is not None:
+            for name, entry in table['commands'].items():
+                self.add_command_parser(name, help=entry['description'])
+        else:
+            from cliq.core.manifest import Manifest
+            pkg = __import__(self.app.__package__ + '.command', fromlist=[''])
+            for path in pkg.__path__:
+                # the manifest (<cliq>/main/command/_manifest.py) stores descriptions.
+                # a command module is imported only if its manifest entry is stale.
+                manifest = Manifest(path)
+                for name, entry in manifest.commands(self.__load_setup).items():
+                    if name not in self.subparsers.choices :
+                        self.add_command_parser(name, help=entry['description'])
 
-       
-        
-        
+        for name, entry in sorted(self.plugins.items()):
+            if name not in self.subparsers.choices:
+                self.add_command_parser(name, help=entry['description'])
 
+    def __load_setup(self, name, filename):
+        # read _setup_ from the source. import the module only if _setup_ is
+        # not a literal.
+        from cliq.core.metadata import read_metadata
+        try:
+            setup = read_metadata(filename)['setup']
+        except (OSError, SyntaxError, ValueError, TypeError):
+            setup = None
+
+        if not isinstance(setup, dict):
+            mod = __import__(self.app.__package__ + '.command.' + name, fromlist=[''])
+            setup = getattr(mod, '_setup_', {})
+
+        return setup
+
+
+def exit_status(code):
+    """Converts a `SystemExit.code` into an exit status, as the interpreter
+    does: None is 0 and an object other than an integer is printed to stderr.
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
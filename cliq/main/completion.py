@@ -0,0 +1,221 @@
+"""completion: shell completion of apps
+
+`<app> completion bash|zsh|fish` prints a script which makes the shell call
+the app with `<APP>_COMPLETE=<shell>` and the words of the command line:
+
+  $ MYAPP_COMPLETE=bash myapp please s
+  say
+  sum
+
+`main()` of a generated app answers such calls before the app is created,
+from the completion index (see cliq.core.completion). Command modules are
+not imported.
+
+This module is imported before the app itself, so it only imports small
+modules of the standard library.
+"""
+
+import os
+import sys
+
+from cliq.core.completion import CompletionIndex
+from cliq.core.environ import env_name
+from cliq.core.plugins import PluginIndex
+
+SHELLS = ('bash', 'zsh', 'fish')
+
+# options of the top-level parser (see cliq.main.commander)
+TOP_OPTIONS = {'--help' : None, '--version' : None, '--batch' : None, '--profile' : None,
+               '--watch' : None, '--jobs' : None}
+HELP_OPTIONS = {'-h' : None, '--help' : None}
+
+TEMPLATE_BASH = """# bash completion for {name}
+# generated by cliq. load it in ~/.bashrc:
+#
+#   eval "$({name} completion bash)"
+
+_{func}_completion() {{
+    local IFS=$'\\n'
+    COMPREPLY=( $({env}=bash "${{COMP_WORDS[0]}}" "${{COMP_WORDS[@]:1:$COMP_CWORD}}" 2>/dev/null) )
+}}
+complete -o default -F _{func}_completion {name}
+"""
+
+TEMPLATE_ZSH = """#compdef {name}
+# zsh completion for {name}
+# generated by cliq. load it in ~/.zshrc (after compinit):
+#
+#   eval "$({name} completion zsh)"
+
+_{func}() {{
+    local -a candidates
+    candidates=( "${{(@f)$({env}=zsh "${{words[1]}}" "${{(@)words[2,$CURRENT]}}" 2>/dev/null)}}" )
+    if (( ${{#candidates}} )) && [[ -n "${{candidates[1]}}" ]]; then
+        _describe 'values' candidates
+    else
+        _files
+    fi
+}}
+compdef _{func} {name}
+"""
+
+TEMPLATE_FISH = """# fish completion for {name}
+# generated by cliq. load it in ~/.config/fish/config.fish:
+#
+#   {name} completion fish | source
+
+function __{func}_complete
+    set -l tokens (commandline -opc) (commandline -ct)
+    env {env}=fish $tokens 2>/dev/null
+end
+complete -c {name} -a '(__{func}_complete)'
+"""
+
+TEMPLATES = {
+    'bash' : TEMPLATE_BASH,
+    'zsh' : TEMPLATE_ZSH,
+    'fish' : TEMPLATE_FISH,
+}
+
+
+def complete_env_name(package):
+    """<myapp>.main => MYAPP_COMPLETE"""
+    return env_name(package.split('.')[-2], 'COMPLETE')
+
+
+def requested(package):
+    """Returns the shell if the app is called for completion, otherwise None.
+    """
+    shell = os.environ.get(complete_env_name(package))
+    return shell if shell in SHELLS else None
+
+
+def script(package, shell):
+    """Returns the completion script of the app for `shell`.
+    """
+    name = package.split('.')[-2]
+    return TEMPLATES[shell].format(name=name, func=name.replace('-', '_'),
+                                   env=complete_env_name(package))
+
+
+def load_commands(package):
+    """Returns {command name: command} from the completion indexes of the
+    command directories of the app and the plugin index.
+    """
+    # <app>.main is imported. find <app>/main/command without the import
+    # system, which is slow to import.
+    pkg = sys.modules.get(package) or __import__(package, fromlist=[''])
+
+    commands = {}
+    loader = getattr(pkg, '__loader__', None)
+    for path in getattr(pkg, '__path__', []):
+        dirname = os.path.join(path, 'command')
+        for name, command in CompletionIndex(dirname, loader).commands().items():
+            commands.setdefault(name, command)
+
+    # plugin commands: names and descriptions only
+    paths = list(getattr(pkg, '__path__', []))
+    if paths:
+        plugins = PluginIndex(package.split('.')[-2], os.path.join(paths[0], 'command'))
+        for name, plugin in plugins.commands().items():
+            commands.setdefault(name, {'description' : plugin['description'], 'options' : {},
+                                       'arguments' : [], 'subcommands' : {}})
+
+    return commands
+
+
+def candidates(commands, words):
+    """Returns [(candidate, description)] for the last word of `words`, the
+    words of the command line after the app name.
+    """
+    if not words:
+        words = ['']
+    current = words[-1]
+    previous = words[:-1]
+
+    # bash splits `--option=value` into `--option`, `=` and `value`
+    if len(previous) >= 2 and previous[-1] == '=':
+        previous = previous[:-1]
+
+    # options of the app before the command: --profile[=FILE], -j N and
+    # --watch PATHS. the files of PATHS are completed by the shell.
+    while previous and previous[0] in ('--profile', '--watch', '--jobs', '-j'):
+        if previous[1:2] == ['=']:
+            if len(previous) < 3:
+                return []
+            previous = previous[3:]
+        elif previous[0] != '--profile':
+            if len(previous) < 2:
+                return []
+            previous = previous[2:]
+        else:
+            previous = previous[1:]
+
+    if not previous:
+        if current.startswith('-'):
+            return _match(TOP_OPTIONS, current)
+        return _match({name: command['description'] for name, command in commands.items()},
+                      current)
+
+    command = commands.get(previous[0])
+    if command is None:
+        return []
+
+    # the subcommand, if given. options of the command come before it
+    parser = command
+    subcommand = None
+    arguments = []
+    for word in previous[1:]:
+        if subcommand is None and word in command['subcommands']:
+            parser = subcommand = command['subcommands'][word]
+            arguments = []
+        elif not word.startswith('-'):
+            arguments.append(word)
+    options = dict(HELP_OPTIONS, **parser['options'])
+
+    choices = options.get(previous[-1])
+    if choices:
+        return _match(dict.fromkeys(choices, ''), current)
+    if current.startswith('--') and '=' in current:
+        option, value = current.split('=', 1)
+        choices = options.get(option) or []
+        return _match(dict.fromkeys([option + '=' + choice for choice in choices], ''), current)
+    if current.startswith('-'):
+        return _match(dict.fromkeys(options, ''), current)
+    if subcommand is None and command['subcommands']:
+        return _match({name: sub['help'] for name, sub in command['subcommands'].items()},
+                      current)
+    # choices of the positional argument. option values are counted as
+    # arguments, which is good enough for common command lines.
+    if len(arguments) < len(parser['arguments']) and parser['arguments'][len(arguments)]:
+        return _match(dict.fromkeys(parser['arguments'][len(arguments)], ''), current)
+
+    # arguments: fall back to the completion of the shell (files)
+    return []
+
+
+def _match(described, prefix):
+    return [(name, description or '') for name, description in sorted(described.items())
+            if name.startswith(prefix)]
+
+
+def complete(package, shell, words=None, file=None):
+    """Prints completion candidates of `words` (default: sys.argv[1:]) for
+    `shell`, one per line. Returns the exit status.
+    """
+    if words is None:
+        words = sys.argv[1:]
+    if file is None:
+        file = sys.stdout
+
+    for candidate, description in candidates(load_commands(package), words):
+        description = ' '.join(description.split())
+        if shell == 'zsh':
+            candidate = candidate.replace(':', '\\:')
+            file.write(candidate + (':' + description if description else '') + '\n')
+        elif shell == 'fish':
+            file.write(candidate + ('\t' + description if description else '') + '\n')
+        else:
+            file.write(candidate + '\n')
+
+    return 0
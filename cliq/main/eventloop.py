@@ -0,0 +1,110 @@
+"""eventloop: the event loop of async commands
+
+`Commander` runs the coroutines of async commands (`AsyncSimpleCommand`,
+`AsyncComplexCommand`) on one event loop, which is created on first use and
+reused by later commands of the same app (e.g. in batch mode). uvloop is
+used if it is installed.
+
+Ctrl-C cancels the running command. The coroutine can clean up in
+`except asyncio.CancelledError` or `finally`, then KeyboardInterrupt is
+raised as with synchronous commands. A second Ctrl-C interrupts at once.
+"""
+
+import asyncio
+import signal
+import threading
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def new_event_loop():
+    """Returns a new uvloop loop if uvloop is installed, otherwise an asyncio
+    loop.
+    """
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def all_tasks(loop):
+    """Returns the tasks of `loop`. asyncio.all_tasks() needs Python 3.7."""
+    if hasattr(asyncio, 'all_tasks'):
+        return asyncio.all_tasks(loop)
+    return asyncio.Task.all_tasks(loop)
+
+
+class EventLoop(object):
+    def __init__(self):
+        self.__loop = None
+
+    @property
+    def loop(self):
+        if self.__loop is None or self.__loop.is_closed():
+            self.__loop = new_event_loop()
+            asyncio.set_event_loop(self.__loop)
+        return self.__loop
+
+    def run(self, coro):
+        """Runs a coroutine until it completes and returns its result.
+
+        Tasks left running by the coroutine are cancelled.
+        """
+        loop = self.loop
+        task = loop.create_task(coro)
+        interrupted = []
+
+        def interrupt(signum, frame):
+            if interrupted or task.done():
+                raise KeyboardInterrupt
+            interrupted.append(signum)
+            loop.call_soon_threadsafe(task.cancel)
+
+        # only the main thread receives signals. keep a custom handler.
+        previous = None
+        if (threading.current_thread() is threading.main_thread()
+            and signal.getsignal(signal.SIGINT) is signal.default_int_handler):
+            previous = signal.signal(signal.SIGINT, interrupt)
+
+        try:
+            return loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            if interrupted:
+                raise KeyboardInterrupt from None
+            raise
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGINT, previous)
+            self.__cancel_tasks()
+
+    def __cancel_tasks(self):
+        loop = self.__loop
+        tasks = [task for task in all_tasks(loop) if not task.done()]
+        if not tasks:
+            return
+
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    def close(self):
+        """Cancels remaining tasks, shuts down async generators and the
+        default executor, and closes the loop.
+        """
+        loop = self.__loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            self.__cancel_tasks()
+            # shutdown_asyncgens() needs Python 3.6
+            if hasattr(loop, 'shutdown_asyncgens'):
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            if hasattr(loop, 'shutdown_default_executor'):
+                loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+            self.__loop = None
@@ -0,0 +1,72 @@
+"""hooks: lifecycle events of an app
+
+Functions registered on `app.hooks` are called with an event dict:
+
+  before_parse  argv                      `Commander.run` starts
+  after_parse   command, argv             the command to run is known
+  before_run    command, argv             `Command.run` is called
+  after_run     command, status, duration `Command.run` returned or exited
+  on_error      command, error, duration  `Command.run` raised
+  on_exit       status, duration          `App.exit`
+
+Every event also has `event` (the name), `time` (time.time()), `app` and
+`pid`. Durations are in seconds; `duration` of `on_exit` is measured from
+the creation of the app (in an app server, from the start of the request).
+
+    def log(event):
+        print(event['command'], event['duration'], file=sys.stderr)
+
+    app.hooks.add('after_run', log)
+
+A sink receives all events (see cliq.main.sinks):
+
+    app.hooks.add_sink(sink)     # sink.emit(event)
+
+An exception raised by a hook is printed and ignored.
+"""
+
+import os
+import sys
+import time
+import traceback
+
+EVENTS = ('before_parse', 'after_parse', 'before_run', 'after_run', 'on_error', 'on_exit')
+
+
+class Hooks(object):
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.__hooks = {event: [] for event in EVENTS}
+        self.__count = 0
+
+    def __bool__(self):
+        return self.__count > 0
+
+    def add(self, event, func):
+        """Calls `func(event)` on `event`."""
+        if event not in self.__hooks:
+            raise ValueError('unknown event: {}'.format(event))
+        self.__hooks[event].append(func)
+        self.__count += 1
+
+    def remove(self, event, func):
+        self.__hooks[event].remove(func)
+        self.__count -= 1
+
+    def add_sink(self, sink):
+        """Calls `sink.emit(event)` on all events."""
+        for event in EVENTS:
+            self.add(event, sink.emit)
+
+    def emit(self, event, **info):
+        """Calls the functions registered for `event`."""
+        if not self.__hooks[event]:
+            return
+
+        info.update(event=event, time=time.time(), app=self.app_name, pid=os.getpid())
+        for func in list(self.__hooks[event]):
+            try:
+                func(info)
+            except Exception:
+                # hooks must not break commands
+                traceback.print_exc(file=sys.stderr)
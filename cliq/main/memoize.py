@@ -0,0 +1,199 @@
+"""memoize: cached results of commands
+
+A command whose output is a pure function of its inputs can declare
+`_setup_['cache']`. A run is then looked up in the result cache of the
+workspace (`.<app>/cache`, see cliq.core.cache) and, on a hit, its output
+and exit status are replayed without running the command:
+
+    _setup_ = {
+        'description' : 'report',
+        'arguments' : [{'names' : ['data'], 'help' : 'data file'}],
+        'cache' : {
+            'config' : ['report.currency'],   # config values in the key
+            'inputs' : ['data'],              # arguments naming input files
+            'check' : 'mtime',                # or 'content' (sha256)
+        },
+    }
+
+`'cache' : True` keys runs by argv alone. The key also includes the
+command, the mtime of its source, the app version, the working directory
+and whether stdout is a terminal. Only successful runs (exit status 0) are
+stored. The output of a run is written as it is produced and recorded on the
+way. The size of the cache is bounded by the config value `cache.max_size`
+(bytes).
+
+Outside a workspace, commands run uncached.
+"""
+
+import io
+import os
+import sys
+import weakref
+
+from cliq.core.cache import (CACHE_DIRNAME, DEFAULT_MAX_SIZE, ResultCache, file_fingerprint,
+                             make_key)
+
+# the cache of each app, whose counts are saved when the app exits
+_caches = weakref.WeakKeyDictionary()
+
+
+def cache_options(setup):
+    """Returns the cache options of `_setup_`, or None if the command is not
+    cached.
+    """
+    options = setup.get('cache') if isinstance(setup, dict) else None
+    if options is True:
+        return {}
+    return options if isinstance(options, dict) else None
+
+
+def open_cache(app):
+    """Returns the result cache of the workspace of `app`, or None outside a
+    workspace.
+    """
+    try:
+        dotdirname = app.config.finder.local_config_dirname
+    except Exception:
+        return None
+
+    dirname = os.path.join(dotdirname, CACHE_DIRNAME)
+    cache = _caches.get(app)
+    if cache is not None:
+        if cache.dirname == dirname:
+            return cache
+        cache.save_counts()
+
+    try:
+        max_size = int(app.config.get('cache', 'max_size', fallback=DEFAULT_MAX_SIZE))
+    except ValueError:
+        max_size = DEFAULT_MAX_SIZE
+
+    cache = ResultCache(dirname, max_size)
+    if app not in _caches:
+        # hits are counted without writing on the hit path
+        app.hooks.add('on_exit', lambda event: _caches[app].save_counts())
+    _caches[app] = cache
+    return cache
+
+
+def run(app, command, options, argv, run_command):
+    """Runs `run_command(command, argv)` through the result cache. Returns
+    the exit status.
+    """
+    cache = open_cache(app)
+    if cache is None:
+        return run_command(command, argv)
+
+    key = make_key(*key_parts(app, command, options, argv))
+    entry = cache.get(key)
+    if entry is not None:
+        _write(sys.stdout, entry['stdout'])
+        _write(sys.stderr, entry['stderr'])
+        return entry['status']
+
+    # output streams through, and is recorded for the cache
+    stdout, stderr = _Tee(sys.stdout), _Tee(sys.stderr)
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        status = run_command(command, argv)
+    finally:
+        sys.stdout, sys.stderr = saved
+
+    if status == 0:
+        cache.put(key, status, stdout.recorded.getvalue(), stderr.recorded.getvalue())
+
+    return status
+
+
+def key_parts(app, command, options, argv):
+    """Returns the parts of the key of a run."""
+    module = sys.modules.get(type(command).__module__)
+    source = getattr(module, '__file__', None)
+
+    parts = [
+        type(command).__module__ + '.' + type(command).__qualname__,
+        file_fingerprint(source) if source else None,
+        str(app.version),
+        app.cwd,
+        list(argv),
+        _isatty(sys.stdout),
+    ]
+
+    for name in options.get('config', []):
+        section, _, option = name.partition('.')
+        parts.append((name, app.config.get(section, option, fallback=None)))
+
+    inputs = options.get('inputs', [])
+    if inputs:
+        # argparse errors and --help exit here, as they would in the command
+        args = command.parse_args(argv)
+        content = options.get('check', 'mtime') == 'content'
+        for dest in inputs:
+            value = getattr(args, dest, None)
+            filenames = value if isinstance(value, (list, tuple)) else [value]
+            for filename in filenames:
+                if isinstance(filename, str):
+                    parts.append(file_fingerprint(os.path.join(app.cwd, filename), content))
+
+    return tuple(parts)
+
+
+class _Tee(object):
+    """A text stream which writes to `stream` and records the encoded output
+    in `recorded`. Bytes written to `buffer` are recorded too.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.encoding = getattr(stream, 'encoding', None) or 'utf-8'
+        self.errors = getattr(stream, 'errors', None) or 'strict'
+        self.recorded = io.BytesIO()
+        if hasattr(stream, 'buffer'):
+            self.buffer = _BufferTee(stream.buffer, self)
+
+    def write(self, text):
+        written = self.stream.write(text)
+        self.recorded.write(text.encode(self.encoding, self.errors))
+        return written
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class _BufferTee(object):
+    def __init__(self, buffer, tee):
+        self.__buffer = buffer
+        self.__tee = tee
+
+    def write(self, data):
+        # after the text written before
+        self.__tee.stream.flush()
+        written = self.__buffer.write(data)
+        self.__tee.recorded.write(data)
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self.__buffer, name)
+
+
+def _isatty(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _write(stream, data):
+    if not data:
+        return
+    stream.flush()
+    if hasattr(stream, 'buffer'):
+        stream.buffer.write(data)
+        stream.buffer.flush()
+    else:
+        stream.write(data.decode(getattr(stream, 'encoding', None) or 'utf-8', 'replace'))
@@ -0,0 +1,128 @@
+"""profiler: phase timings of a run (`<app> --profile[=FILE] ...`)
+
+`--profile` prints to stderr how long each phase of the run took:
+
+  startup      the interpreter, from the start of the process to `App`
+  app          `App.__init__`, including the import of the version
+  lookup       finding the command module
+  import       importing the command module
+  init         creating the command (`init(app)`)
+  run          `Command.run`
+  parser       building an argparse parser, nested in the phase it occurs in
+  config       finding and parsing config files, nested as well
+
+`--profile=FILE` also writes a cProfile dump of the command phases to FILE
+(`python -m pstats FILE`), and `--profile=-` prints a pstats summary
+instead.
+
+This module is imported only if `--profile` is given.
+"""
+
+import contextlib
+import os
+import sys
+import time
+
+# functions in the pstats summary
+SUMMARY_LIMIT = 25
+
+
+def process_start():
+    """Returns the start of the process on the `time.perf_counter()` clock,
+    or None if it is not known. The resolution is a clock tick (10 ms).
+    """
+    try:
+        with open('/proc/self/stat') as file:
+            stat = file.read()
+        # the fields after the command name, which may contain spaces
+        starttime = int(stat.rsplit(')', 1)[1].split()[19])
+        elapsed = (time.clock_gettime(time.CLOCK_BOOTTIME)
+                   - starttime / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+    return time.perf_counter() - elapsed
+
+
+class Profiler(object):
+    def __init__(self, filename=None):
+        """
+        filename: the cProfile dump, '-' for a pstats summary or None
+        """
+        self.filename = filename
+        self.phases = []     # [(depth, name, seconds)]
+        self.__depth = 0
+        self.__profile = None
+        self.__started = None
+
+    def start(self, timestamps=None):
+        """Starts profiling. `timestamps` of the app (see `App.timestamps`)
+        add the startup and app phases.
+        """
+        self.__started = time.perf_counter()
+
+        if timestamps and 'init' in timestamps:
+            started = process_start()
+            if started is not None and started <= timestamps['init']:
+                self.add('startup', timestamps['init'] - started)
+                self.__started = started
+            else:
+                # the CPU time of the process until App is close to the
+                # wall time of a startup
+                self.add('startup (cpu)', timestamps['init_cpu'])
+                self.__started = timestamps['init']
+            self.add('app', timestamps['ready'] - timestamps['init'])
+
+        if self.filename is not None:
+            import cProfile
+            self.__profile = cProfile.Profile()
+            self.__profile.enable()
+
+    def stop(self, file=None):
+        """Stops profiling and prints the report to `file` (default: stderr).
+        """
+        total = time.perf_counter() - self.__started
+
+        if self.__profile is not None:
+            self.__profile.disable()
+
+        if file is None:
+            file = sys.stderr
+        self.report(total, file)
+
+        if self.__profile is None:
+            pass
+        elif self.filename == '-':
+            import pstats
+            print(file=file)
+            stats = pstats.Stats(self.__profile, stream=file)
+            stats.sort_stats('cumulative').print_stats(SUMMARY_LIMIT)
+        else:
+            try:
+                self.__profile.dump_stats(self.filename)
+            except OSError as e:
+                print('profile: cannot write {}: {}'.format(self.filename, e), file=file)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Times the phase `name`. Phases may be nested.
+        """
+        index = len(self.phases)
+        self.phases.append((self.__depth, name, 0.0))
+        self.__depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__depth -= 1
+            self.phases[index] = (self.__depth, name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.phases.append((self.__depth, name, seconds))
+
+    def report(self, total, file):
+        print('{:<24} {:>10}'.format('phase', 'ms'), file=file)
+        for depth, name, seconds in self.phases:
+            print('{:<24} {:>10.2f}'.format('  ' * depth + name, seconds * 1000), file=file)
+        print('{:<24} {:>10.2f}'.format('total', total * 1000), file=file)
+
@@ -0,0 +1,248 @@
+"""server: a pre-warmed app server
+
+The server creates an `App`, imports all its commands and listens on a
+per-user Unix socket (see cliq.main.client). Each request runs in a forked
+worker process with the argv, cwd, env and stdio file descriptors of the
+client, so workers start with everything already imported.
+
+The server shuts down after an idle timeout (`<APP>_DAEMON_TIMEOUT`
+seconds, default 600) and when command sources have changed. The next client
+then starts a new server.
+
+usage:
+
+  $ python -m cliq.main.server <myapp>.main
+"""
+
+import array
+import json
+import os
+import signal
+import socket
+import sys
+
+from cliq.main import client
+from cliq.main.cli import App
+from cliq.main.commander import exit_status
+from cliq.core.config import env_name
+from cliq.core.plugins import path_key
+from cliq.core.manifest import Manifest
+
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+class Server(object):
+    def __init__(self, package, idle_timeout=None):
+        """
+        package: package name. eg) <myapp>.main or <mylib>.<mycli>.main
+        """
+        self.package = package
+        self.path = client.socket_path(package)
+
+        if idle_timeout is None:
+            idle_timeout = float(os.environ.get(env_name(client.app_name(package), 'DAEMON_TIMEOUT'),
+                                                DEFAULT_IDLE_TIMEOUT))
+        self.idle_timeout = idle_timeout
+
+        self.app = App(package)
+        self.__command_dirnames = list(__import__(package + '.command', fromlist=['']).__path__)
+        self.__signature = self.__sources_signature()
+        self.__prewarm()
+
+        # `--profile` of a request: the startup of the server is not that of
+        # the request
+        self.app.timestamps.clear()
+
+    def __prewarm(self):
+        # build the command parsers and import all command modules
+        self.app.commander._register_commands()
+        pkg = __import__(self.package + '.command', fromlist=[''])
+        for dirname in self.__command_dirnames:
+            for name in Manifest(dirname).sources():
+                # importing a submodule sets an attribute of the package.
+                # do not shadow main() or init() of a main command.
+                if callable(getattr(pkg, name, None)):
+                    continue
+                try:
+                    __import__(self.package + '.command.' + name, fromlist=[''])
+                except Exception:
+                    pass
+
+    def __sources_signature(self):
+        signature = []
+        for dirname in self.__command_dirnames:
+            for name, filename in sorted(Manifest(dirname).sources().items()):
+                try:
+                    stat = os.stat(filename)
+                    signature.append((filename, stat.st_mtime_ns, stat.st_size))
+                except OSError:
+                    signature.append((filename, None, None))
+        # installed or removed plugins (see cliq.core.plugins)
+        signature.extend(path_key())
+        return signature
+
+    def serve(self):
+        listener = self.__listen()
+        if listener is None:
+            return
+
+        # workers are not waited for
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        listener.settimeout(self.idle_timeout)
+        try:
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    break
+
+                with conn:
+                    # only the user of the server may run requests
+                    try:
+                        if client.peer_uid(conn) != os.getuid():
+                            continue
+                    except OSError:
+                        continue
+                    conn.settimeout(None)
+                    if self.__sources_signature() != self.__signature:
+                        self.__restart(conn)
+                        break
+                    self.__handle(conn, listener)
+        finally:
+            listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __listen(self):
+        if not client.secure_dirname(os.path.dirname(self.path)):
+            return None
+
+        if os.path.exists(self.path):
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                conn.connect(self.path)
+                return None     # another server is running
+            except OSError:
+                os.unlink(self.path)
+            finally:
+                conn.close()
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self.path)
+        except OSError:
+            listener.close()
+            return None
+        os.chmod(self.path, 0o600)
+        listener.listen(64)
+
+        return listener
+
+    def __restart(self, conn):
+        # tell the client to start a new server
+        try:
+            request, fds = self.__recv_request(conn)
+            for fd in fds:
+                os.close(fd)
+            conn.sendall(client.STATUS.pack(client.RESTART))
+        except (OSError, EOFError, ValueError):
+            pass
+
+    def __handle(self, conn, listener):
+        try:
+            request, fds = self.__recv_request(conn)
+        except (OSError, EOFError, ValueError):
+            return
+
+        pid = os.fork()
+        if pid == 0:
+            # a long request must not keep the socket of the server open
+            listener.close()
+            status = 1
+            try:
+                status = self.__work(conn, request, fds)
+            finally:
+                os._exit(status)
+        else:
+            for fd in fds:
+                os.close(fd)
+
+    def __recv_request(self, conn):
+        fds = array.array('i')
+        msg, ancdata, flags, addr = conn.recvmsg(client.HEADER.size,
+                                                 socket.CMSG_SPACE(3 * fds.itemsize))
+        for level, type, data in ancdata:
+            if level == socket.SOL_SOCKET and type == socket.SCM_RIGHTS:
+                fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+
+        if len(msg) < client.HEADER.size:
+            msg += client.recv_exactly(conn, client.HEADER.size - len(msg))
+        size, = client.HEADER.unpack(msg)
+        request = json.loads(client.recv_exactly(conn, size).decode())
+
+        if len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            raise ValueError('stdio file descriptors expected')
+
+        return request, list(fds)
+
+    def __work(self, conn, request, fds):
+        # worker process: take over the client's stdio, cwd and env
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False, buffering=1 if os.isatty(1) else -1)
+        sys.stderr = open(2, 'w', closefd=False, buffering=1)
+
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        sys.argv = [self.app.name] + request['argv']
+        self.app.cwd = request['cwd']
+
+        conn.sendall(client.STATUS.pack(os.getpid()))
+
+        try:
+            self.app.exit(self.app.run(request['argv']))
+        except SystemExit as e:
+            status = exit_status(e.code)
+        except KeyboardInterrupt:
+            status = 130
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            status = 1
+
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except OSError:
+            pass
+
+        try:
+            conn.sendall(client.STATUS.pack(status))
+        except OSError:
+            pass
+
+        return status
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if len(argv) != 1:
+        sys.exit('usage: python -m cliq.main.server <package>')
+
+    Server(argv[0]).serve()
+
+if __name__ == '__main__':
+    main()
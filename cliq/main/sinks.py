@@ -0,0 +1,88 @@
+"""sinks: export of lifecycle events (see cliq.main.hooks)
+
+Set by environment variables, without changing commands:
+
+  <APP>_METRICS=FILE  appends every event to FILE as a line of JSON
+  <APP>_TRACE=FILE    appends command runs and app runs to FILE in the
+                      Chrome trace-event format (chrome://tracing, Perfetto)
+
+Both files are opened in append mode and written one record per write(),
+so concurrent runs of an app can share them.
+"""
+
+import json
+import os
+
+from cliq.core.config import env_name
+
+
+def install(app):
+    """Adds the sinks requested by the environment to `app.hooks`."""
+    filename = os.environ.get(env_name(app.name, 'METRICS'))
+    if filename:
+        app.hooks.add_sink(JsonLinesSink(filename))
+
+    filename = os.environ.get(env_name(app.name, 'TRACE'))
+    if filename:
+        app.hooks.add_sink(ChromeTraceSink(filename))
+
+
+class FileSink(object):
+    # written before the first record of a file
+    header = ''
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def write(self, record):
+        # one write() with O_APPEND: records of concurrent processes are not
+        # interleaved
+        data = record.encode('utf-8')
+        fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if self.header and os.fstat(fd).st_size == 0:
+                data = self.header.encode('utf-8') + data
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+class JsonLinesSink(FileSink):
+    """Writes every event as a line of JSON."""
+
+    def emit(self, event):
+        self.write(json.dumps(event, default=str, sort_keys=True) + '\n')
+
+
+class ChromeTraceSink(FileSink):
+    """Writes command runs (`after_run`, `on_error`) and app runs (`on_exit`)
+    as complete events of the Chrome trace-event format.
+
+    The file is a JSON array without the closing `]`, which the format
+    allows, so runs can be appended.
+    """
+
+    header = '[\n'
+
+    def emit(self, event):
+        if event['event'] in ('after_run', 'on_error'):
+            name, category = event['command'], 'command'
+            args = ({'status' : event['status']} if event['event'] == 'after_run'
+                    else {'error' : str(event['error'])})
+        elif event['event'] == 'on_exit' and event['duration'] is not None:
+            name, category = event['app'], 'app'
+            args = {'status' : event['status']}
+        else:
+            return
+
+        duration = event['duration']
+        self.write(json.dumps({
+            'name' : name,
+            'cat' : category,
+            'ph' : 'X',
+            'ts' : round((event['time'] - duration) * 1e6),
+            'dur' : round(duration * 1e6),
+            'pid' : event['pid'],
+            'tid' : 0,
+            'args' : args,
+        }, default=str) + ',\n')
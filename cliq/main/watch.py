@@ -0,0 +1,72 @@
+"""watch: re-run a command when files change
+
+`<app> --watch PATHS <command> ...` runs the command, then waits for
+changes of PATHS (comma-separated files and directories, see
+cliq.core.watcher) and runs it again with the same argv, until Ctrl-C. The
+app, the imported modules and the command stay in memory, so a re-run only
+pays for `Command.run`.
+
+Changes of the command modules themselves are not reloaded. Set
+`<APP>_WATCH_POLL` to scan the files instead of using inotify (e.g. on
+network file systems).
+"""
+
+import os
+import sys
+import traceback
+
+from cliq.core.config import env_name
+from cliq.core.watcher import Watcher
+
+MAX_LISTED = 3
+
+
+def run(app, paths, argv, run_once):
+    """Runs `run_once(argv)` and re-runs it on changes of `paths`. Returns
+    the exit status of the last run, or 130 on Ctrl-C.
+    """
+    poll = bool(os.environ.get(env_name(app.name, 'WATCH_POLL')))
+    try:
+        watcher = Watcher(paths, poll=poll)
+    except OSError as e:
+        print('{}: cannot watch {}: {}'.format(app.name, e.filename or ', '.join(paths),
+                                                e.strerror or e), file=sys.stderr)
+        return 1
+
+    try:
+        while True:
+            status = _run(run_once, argv)
+            _message('exit {}. watching {} ({}), Ctrl-C to stop'
+                     .format(status, ', '.join(paths), watcher.method))
+            changed = watcher.wait()
+            _message('changed: {}'.format(_describe(changed, app.cwd)))
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        watcher.close()
+
+
+def _run(run_once, argv):
+    from cliq.main.commander import exit_status
+
+    try:
+        return run_once(argv)
+    except SystemExit as e:
+        return exit_status(e.code)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+
+
+def _message(message):
+    print('==> ' + message, file=sys.stderr)
+    sys.stderr.flush()
+
+
+def _describe(paths, cwd):
+    names = [os.path.relpath(path, cwd) for path in paths[:MAX_LISTED]]
+    if len(paths) > MAX_LISTED:
+        names.append('and {} more'.format(len(paths) - MAX_LISTED))
+    return ', '.join(names)
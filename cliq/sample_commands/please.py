@@ -7,7 +7,7 @@ _setup_ = {
 }
 
 import sys
-from cliq.main.command import ComplexCommand
+from cliq.main.command import ComplexCommand, subcommand
 
 def init(app):
     return PleaseCommand(app)
@@ -16,14 +16,15 @@ class PleaseCommand(ComplexCommand):
     def __init__(self, app = None, name = 'please'):
         super().__init__(app, name)
 
-        say_parser = self.add_parser('say', help='say something')
-        say_parser.add_argument('something', type=str, help='something')
-        say_parser.add_argument('-f', '--format', type=str, default='text/plain', help='format')
-        say_parser.set_defaults(func='say')
-        
-        sum_parser = self.add_parser('sum', help='sum numbers')
-        sum_parser.add_argument('numbers', type=float, nargs='+', help='numbers')
-        sum_parser.set_defaults(func='sum')
+    # arguments of a subcommand are added only when it is used
+    @subcommand('say', help='say something')
+    def say_parser(self, parser):
+        parser.add_argument('something', type=str, help='something')
+        parser.add_argument('-f', '--format', type=str, default='text/plain', help='format')
+
+    @subcommand('sum', help='sum numbers')
+    def sum_parser(self, parser):
+        parser.add_argument('numbers', type=float, nargs='+', help='numbers')
 
     def say(self, args):
         print(args.something)
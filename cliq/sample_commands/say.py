@@ -3,7 +3,11 @@
 
 _setup_ = {
     'version' : '0.1.0',
-    'description' : 'a toy simple command'
+    'description' : 'a toy simple command',
+    'arguments' : [
+        {'names' : ['something'], 'type' : 'str', 'help' : 'something'},
+        {'names' : ['-f', '--format'], 'type' : 'str', 'default' : 'text/plain', 'help' : 'format'},
+    ],
 }
 
 import sys
@@ -16,11 +20,8 @@ class SayCommand(SimpleCommand):
     def __init__(self, app = None, name = 'say'):
         super().__init__(app, name)
         
-        self.parser.add_argument('something', type=str, help='something')
-        self.parser.add_argument('-f', '--format', type=str, default='text/plain', help='format')
-        
     def run(self, argv):
-        args = self.parser.parse_args(argv)
+        args = self.parse_args(argv)
         print(args.something)
  
 def main(argv=None):
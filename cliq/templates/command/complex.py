@@ -7,7 +7,7 @@ _setup_ = {{
 }}
 
 import sys
-from cliq.main.command import ComplexCommand
+from cliq.main.command import ComplexCommand, subcommand
 
 def init(app):
     return Command(app)
@@ -16,11 +16,10 @@ class Command(ComplexCommand):
     def __init__(self, app = None, name = __name__):
         super().__init__(app, name)
         
-        # self.add_parser() adds an argparse.ArumentParser
-        # see https://docs.python.org/3/library/argparse.html       
- 
-        {parsers}
-        
+    # a @subcommand method adds arguments to the argparse.ArgumentParser of
+    # a subcommand, only when the subcommand is used.
+    # see https://docs.python.org/3/library/argparse.html
+    {parsers}
     {funcs}
     
 def main(argv=None):
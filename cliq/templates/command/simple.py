@@ -4,6 +4,14 @@
 _setup_ = {{
     'version' : '0.0.0',
     'description' : '{description}',
+    # declare arguments with the keyword arguments of add_argument().
+    # see https://docs.python.org/3/library/argparse.html
+    #
+    # 'arguments' : [
+    #     {{'names' : ['input'], 'type' : 'str', 'help' : 'input filename'}},
+    #     {{'names' : ['-v', '--verbose'], 'action' : 'store_true', 'help' : 'verbose'}},
+    #     {{'names' : ['-o', '--output'], 'type' : 'str', 'help' : 'output filename'}},
+    # ],
 }}
 
 import sys
@@ -16,17 +24,14 @@ class Command(SimpleCommand):
     def __init__(self, app = None, name = __name__):
         super().__init__(app, name)
 
-        # self.parser is an argparse.ArumentParser
-        # see https://docs.python.org/3/library/argparse.html       
+        # arguments declared in _setup_ are parsed without building
+        # self.parser, an argparse.ArgumentParser. arguments which cannot be
+        # declared (e.g. with a custom type) can still be added to it:
         #
-        # add arguments. for example:
-        #
-        # self.parser.add_argument('input', type=str, help='input filename')
-        # self.parser.add_argument('-v', '--verbose', action='store_true', help='verbose')
-        # self.parser.add_argument('-o', '--output', type=str, help='output filename')
+        # self.parser.add_argument('date', type=datetime.date.fromisoformat)
 
     def run(self, argv):
-        args = self.parser.parse_args(argv)
+        args = self.parse_args(argv)
 
         # implement command line functionalities
         print(args)
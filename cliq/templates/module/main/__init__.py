@@ -2,12 +2,26 @@
 
 """main: entry-point"""
 
-import cliq.main.cli
+import sys
 
 def main():
     """entry-point for console-script
     """
-    app = cliq.main.cli.App(__package__)
+    # answer shell completion (<APP>_COMPLETE=<shell>) from the command index
+    from cliq.main import completion
+    shell = completion.requested(__package__)
+    if shell is not None:
+        sys.exit(completion.complete(__package__, shell))
+
+    # forward to a pre-warmed app server if enabled by <APP>_DAEMON=1
+    from cliq.main import client
+    if client.enabled(__package__):
+        status = client.run(__package__)
+        if status is not None:
+            sys.exit(status)
+
+    from cliq.main import cli
+    app = cli.App(__package__)
     app.run()
     app.exit()
 
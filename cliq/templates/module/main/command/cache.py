@@ -0,0 +1,12 @@
+"""cache
+"""
+
+_setup_ = {
+    'version' : '0.0.1',
+    'description' : 'Show or clear the result cache of the workspace'
+}
+
+import cliq.main.command.cache
+
+def init(app):
+    return cliq.main.command.cache.init(app)
@@ -0,0 +1,12 @@
+"""completion
+"""
+
+_setup_ = {
+    'version' : '0.0.1',
+    'description' : 'Print a shell completion script'
+}
+
+import cliq.main.command.completion
+
+def init(app):
+    return cliq.main.command.completion.init(app)
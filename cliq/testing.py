@@ -0,0 +1,140 @@
+"""testing: run apps in process
+
+`CliRunner` runs an app in the current interpreter, as `myapp <argv>` would
+in a new process, and returns the exit status and the output. Command
+modules stay imported between runs, so a test suite does not pay for a
+process and the imports of every case.
+
+    from cliq.testing import CliRunner
+
+    def test_say():
+        with CliRunner('myapp.main') as runner:
+            result = runner.invoke(['say', 'hello'])
+            assert result.exit_code == 0
+            assert result.stdout == 'hello\\n'
+
+Each runner has its own temporary home directory, config directory
+(`XDG_CONFIG_HOME`) and working directory, which are removed by `close()`.
+During a run, the working directory, `os.environ`, `sys.argv` and the
+standard streams are replaced and then restored. Environment variables of
+the app (`<APP>_*`) are not inherited.
+
+Runs are not thread-safe, as they change process-wide state.
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from cliq.core.config import env_name
+
+class Result(object):
+    def __init__(self, exit_code, stdout, stderr, exception=None, exc_info=None):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exception = exception     # raised by the app, other than SystemExit
+        self.exc_info = exc_info
+
+    @property
+    def output(self):
+        """stdout and stderr"""
+        return self.stdout + self.stderr
+
+    def __repr__(self):
+        return '<Result {}>'.format(repr(self.exception) if self.exception
+                                    else 'exit {}'.format(self.exit_code))
+
+
+class CliRunner(object):
+    def __init__(self, package, env=None):
+        """
+        package: the package of the app. eg) myapp.main or mylib.mycli.main
+        env: environment variables of every run
+        """
+        self.package = package
+        self.name = package.split('.')[-2]
+        self.env = dict(env or {})
+        self.root = tempfile.mkdtemp(prefix='cliq-runner-')
+        self.home = os.path.join(self.root, 'home')
+        self.config_home = os.path.join(self.root, 'config')
+        self.cwd = os.path.join(self.root, 'work')
+        for dirname in (self.home, self.config_home, self.cwd):
+            os.makedirs(dirname)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Removes the temporary directories."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def environ(self, env=None):
+        """Returns the environment of a run: os.environ without the variables
+        of the app, with the directories of the runner, `self.env` and `env`.
+        """
+        prefix = env_name(self.name, '')
+        environ = {name: value for name, value in os.environ.items()
+                   if not name.startswith(prefix)}
+        environ.update(HOME=self.home, XDG_CONFIG_HOME=self.config_home)
+        environ.update(self.env)
+        environ.update(env or {})
+        return environ
+
+    def invoke(self, argv, input=None, env=None, cwd=None, catch_exceptions=True):
+        """Runs the app with `argv` and returns a `Result`.
+
+        input: stdin, a str or bytes
+        env: environment variables of this run
+        cwd: the working directory (default: `self.cwd`)
+        catch_exceptions: if False, an exception raised by the app is raised
+        """
+        from cliq.main.cli import App
+
+        if isinstance(input, str):
+            input = input.encode('utf-8')
+        stdin = io.TextIOWrapper(io.BytesIO(input or b''), encoding='utf-8')
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+        stderr = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+
+        saved_environ = dict(os.environ)
+        saved_cwd = os.getcwd()
+        saved_argv = sys.argv
+        saved_streams = sys.stdin, sys.stdout, sys.stderr
+
+        exit_code, exception, exc_info = 0, None, None
+        try:
+            os.environ.clear()
+            os.environ.update(self.environ(env))
+            os.chdir(cwd or self.cwd)
+            sys.argv = [self.name] + list(argv)
+            sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+
+            app = App(self.package)
+            try:
+                app.exit(app.run(list(argv)))
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception as e:
+                if not catch_exceptions:
+                    raise
+                exit_code, exception, exc_info = 1, e, sys.exc_info()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            sys.argv = saved_argv
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_environ)
+
+        return Result(exit_code, _decode(stdout), _decode(stderr), exception, exc_info)
+
+
+def _decode(stream):
+    return stream.buffer.getvalue().decode('utf-8', 'replace')